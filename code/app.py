@@ -5,12 +5,18 @@ from tkinter import ttk
 from tkinter import filedialog
 import models as m
 import file_handler as fh
+import watcher as w
+import library as lib
+import search_index as si
+import dice_utils
 import os
-import random
+
+# Milliseconds between checks of the loaded folder for changed files
+WATCH_INTERVAL = 1000
 
 class TableRollerApp():
-    def __init__(self, debug:bool=False) -> None:
-        random.seed()
+    def __init__(self, debug:bool=False, seed=None) -> None:
+        self.rng = dice_utils.Rng(seed)
         self.curr_table = None
 
         self.debug = debug
@@ -26,11 +32,17 @@ class TableRollerApp():
 
         self.file_handler = fh.FileHandler(os.path.dirname(
             os.path.realpath(__file__)))
-        self.resolver = m.Resolver()
+        self.resolver = m.Resolver(rng=self.rng,
+            trace=m.logTrace if self.debug else None)
+        self.watcher = None
+        self.library = None
+        self.search_index = None
+        self.checked_tables = set()
 
         self.initWidgets()
 
         self.list_tables.bind("<ButtonRelease-1>", self.onTableSelection)
+        self.entry_search.bind("<Return>", self.onSearch)
 
     def initWidgets(self) -> None:
         # MENUS
@@ -55,9 +67,14 @@ class TableRollerApp():
         self.menu_bar.add_cascade(label="Tools", menu=self.menu_tools)
 
         # TABLE LIST
-        self.list_tables = tk.Listbox(self.root)
-        self.list_tables.grid(column=0, row=0, rowspan=2,
+        self.frame_tables = tk.Frame(self.root)
+        self.frame_tables.grid(column=0, row=0, rowspan=2,
             sticky=(tk.N, tk.E, tk.S, tk.W), padx=2, pady=2)
+        # Search box, lists the tables with results containing its text
+        self.entry_search = tk.Entry(self.frame_tables)
+        self.entry_search.pack(fill=tk.X, pady=(0, 2))
+        self.list_tables = tk.Listbox(self.frame_tables)
+        self.list_tables.pack(fill=tk.BOTH, expand=1)
         self.list_tables.insert(0, "Table List")
         
         # NOTEBOOK WIDGET
@@ -108,10 +125,25 @@ class TableRollerApp():
         file = filedialog.askopenfile("r", title="Choose File...",
             initialdir=self.file_handler.dir, filetypes=(
             ("YAML", "*.yaml *.yml"), ("Text Files", "*.txt"),
-            ("JSON", "*.json")))
+            ("JSON", "*.json"), ("Packed Tables", "*.tpk"),
+            ("SQLite Tables", "*.sqlite *.db")))
         if file:
-            loaded = self.file_handler.loadFile(file.name)
-            self.resolver.update(self.tableConstruction(loaded))
+            if self.watcher:
+                self.watcher.close()
+            self.watcher = self.library = self.search_index = None
+            if file.name.endswith((".tpk", ".sqlite", ".db")):
+                store = (self.file_handler.openPacked(file.name)
+                    if file.name.endswith(".tpk")
+                    else self.file_handler.openSqlite(file.name))
+                if not store:
+                    self.updateTextLogs(f"{file.name} could not be loaded.")
+                    return
+                self.resolver.update(store)
+                self.checked_tables = set()
+                self.updateTableList()
+                return
+            self.resolver.update(self.file_handler.loadTables(file.name))
+            self.search_index = si.SearchIndex(self.resolver.tables)
             self.checkForProblems()
             self.updateTableList()
 
@@ -119,28 +151,40 @@ class TableRollerApp():
         dir = filedialog.askdirectory(title="Choose Folder...",
             initialdir=self.file_handler.dir)
         if dir:
-            blob = self.file_handler.loadFiles(dir)
-            loaded = self.file_handler.loadFiles(dir)
-            tables = {}
-            for dicts in loaded:
-                new_Tabels = self.tableConstruction(dicts)
-                for name, table in new_Tabels.items():
-                    if name not in tables:
-                        tables[name] = table
-                    else:
-                        self.updateTextLogs(
-                            f"TABLE {name} already in loaded tables."
-                        )
-            self.resolver.update(tables)
-            self.checkForProblems()
+            if self.watcher:
+                self.watcher.close()
+            self.watcher = w.TableWatcher(self.file_handler, dir)
+            self.watcher.track()
+            # Tables are listed from the manifest and loaded when first used
+            self.library = lib.TableLibrary(self.file_handler, dir)
+            # Indexing loads every table, so it waits for the first search
+            self.search_index = None
+            for name in self.library.duplicates:
+                self.updateTextLogs(f"TABLE {name} already in loaded tables.")
+            self.checked_tables = set()
+            self.resolver.update(self.library)
             self.updateTableList()
 
-    def tableConstruction(self, data) -> dict:
-        new_dict = {}
-        for k, v in data.items():
-            throw_away = m.Table()
-            new_dict[k] = throw_away.create(v)
-        return new_dict
+    def watchTables(self) -> None:
+        """
+        Reload changed files of the loaded folder, then check again after
+        WATCH_INTERVAL milliseconds.
+        """
+        changed = (self.library.sync(self.watcher.changes()) if self.watcher
+            else None)
+        if changed:
+            self.updateTextLogs("Reloaded tables from changed files.")
+            if self.search_index:
+                self.search_index.update(self.library, [name for name, entry
+                    in self.library.entries.items() if entry.file in changed])
+            self.checked_tables = set()
+            self.updateTableList()
+            if self.curr_table:
+                name = self.curr_table.name
+                self.curr_table = None
+                if name in self.resolver.tables:
+                    self.updateResultList(name)
+        self.root.after(WATCH_INTERVAL, self.watchTables)
 
     def onTableSelection(self, event):
         # get the widget
@@ -152,13 +196,27 @@ class TableRollerApp():
             # send the name of the table to update Result Lists
             self.updateResultList(clicked)
 
+    def onSearch(self, event) -> None:
+        """
+        Event for Return pressed in the search box. Lists the tables with a
+        result containing the search text, every table if it is empty.
+        """
+        query = self.entry_search.get().strip()
+        if not query:
+            self.updateTableList()
+            return
+        if self.search_index is None:
+            self.search_index = si.SearchIndex(self.resolver.tables)
+        hits = self.search_index.search(query)
+        self.updateTableList(list(dict.fromkeys(hit.table for hit in hits)))
+        self.updateTextLogs(f"{len(hits)} results found for '{query}'.")
+
     def onButtonRoll(self) -> None:
         """
         Event for Roll Button Clicked
         """
         if self.curr_table:
-            roll = random.randint(1, self.curr_table.length)
-            result = self.curr_table.getResult(roll)
+            roll, result = self.curr_table.sample(self.rng)
             if result:
                 msg = f"On {self.curr_table.name} rolled {roll:<3}: "
                 msg += f"\n  {self.resolver.get(result)}".replace('\t', ' > ')
@@ -169,15 +227,17 @@ class TableRollerApp():
                 msg += f"{self.curr_table.name}."
                 self.upateTextLogs(msg)
     
-    def updateTableList(self) -> None:
+    def updateTableList(self, names:list=None) -> None:
         """
-        Update the Table list when tables arte loaded from a file.
+        Update the Table list when tables arte loaded from a file. Only the
+        names are read, so tables of a folder are not loaded.
+        :param names: list. Table names to list, every loaded table if None.
         """
-        loaded_dict = self.resolver.tables
+        loaded_dict = self.resolver.tables if names is None else names
         # remove items currently in list
         self.list_tables.delete(0, self.list_tables.size()-1)
         # add items back into list
-        for i, (name, table) in enumerate(loaded_dict.items()):
+        for i, name in enumerate(loaded_dict):
             self.list_tables.insert(i, name)
 
     def updateResultList(self, table_name) -> None:
@@ -186,13 +246,17 @@ class TableRollerApp():
         """
         table = self.resolver.tables[table_name]
         self.curr_table = None if not table else table
+        if table_name not in self.checked_tables:
+            self.checked_tables.add(table_name)
+            self.checkForProblems([table_name])
         # remove 
         if self.curr_table:
             self.listbox_results.delete(0, self.listbox_results.size())
             # add items to the result list
-            for i in range(table.length):
-                self.listbox_results.insert(i, 
-                    f"{i+1:>3}: {table.getRawResult(i+1)}")
+            for i, (low, high, result) in enumerate(table.intervals):
+                rolls = f"{low}" if low == high else f"{low}-{high}"
+                text = result.text if result else None
+                self.listbox_results.insert(i, f"{rolls:>7}: {text}")
         
     def updateTextRolls(self, text:str) -> None:
         """
@@ -226,14 +290,16 @@ class TableRollerApp():
         self.text_rolls.delete("1.0", "end")
         self.text_rolls.config(state=tk.DISABLED)
 
-    def checkForProblems(self) -> None:
+    def checkForProblems(self, names:list=None) -> None:
         """
         Called to check for and log any issues with tables. Output issues to Log
         textbox.
+        :param names: list. Names of the tables to check, every loaded table if
+            None.
         """
         tables = self.resolver.tables
         # Tables check
-        for table in tables:
+        for table in (tables if names is None else names):
             if not tables[table]:
                 self.updateTextLogs(f">> Table '{table}' not loaded properly.")
                 continue
@@ -272,12 +338,15 @@ class TableRollerApp():
         """
         Run the application by calling the tkinter mainloop
         """
+        self.root.after(WATCH_INTERVAL, self.watchTables)
         self.root.mainloop()
 
     def exitApp(self) -> None:
         """
         Close the window and exit the app.
         """
+        if self.watcher:
+            self.watcher.close()
         self.root.destroy()
 
 if __name__ == "__main__":
@@ -4,9 +4,22 @@
     I may have over engineered this a bit.
 '''
 import re
+import os
+import heapq
+import hashlib
+import random
 import logger
-from random import randint, seed
-from typing import List, Dict, Union, Optional
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from functools import lru_cache
+from math import comb, floor, lgamma, log, sqrt
+from random import randint
+from typing import List, Dict, NamedTuple, Union, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 main_logger, models_logger, fhandler_logger = logger.setup_logger()
 
@@ -17,7 +30,91 @@ re_rolls = re.compile("(\d+)d(\d+)", re.IGNORECASE)
 re_keeps = re.compile("(kh|kl)(\d+)", re.IGNORECASE)
 re_mods = re.compile("(\+|\-|\*|\/)(\d+)", re.IGNORECASE)
 
-seed()
+# Maximum amount of compiled roll notations kept by compile_roll()
+COMPILE_CACHE_SIZE = 1024
+# Dice counts from this size up are rolled as a pool, see RollSpec.rollPool()
+BIG_POOL_THRESHOLD = 1000
+# Amount of dice drawn at a time when a pool is streamed
+POOL_CHUNK_SIZE = 4096
+
+_np_rng = np.random.default_rng() if np is not None else None
+
+class Rng():
+    """
+    A seedable stream of random numbers. Pass one to the rolling functions to
+    get reproducible rolls that do not share the global random module state.
+    Child streams made with spawn() are independent of the parent and each
+    other, and can be handed to threads or worker processes.
+    """
+    def __init__(self, seed:Union[int, str, None]=None,
+        key:tuple=()) -> None:
+        """
+        Initialize the stream.
+
+        :param seed: int or str. Seed of the stream. A random seed is picked if
+            none is given, it can be read back from Rng.seed.
+        :param key: tuple. Spawn path of the stream, set by spawn().
+        """
+        if seed is None:
+            seed = int.from_bytes(os.urandom(16), 'big')
+        self._seed = seed
+        self._key = tuple(key)
+        self._spawned = 0
+
+        digest = hashlib.sha256(repr((seed, self._key)).encode()).digest()
+        derived = int.from_bytes(digest[:16], 'big')
+        self._random = random.Random(derived)
+        self._np = np.random.default_rng(derived) if np is not None else None
+
+        # Bound methods for the hot path
+        self.randint = self._random.randint
+        self.random = self._random.random
+
+    def __str__(self):
+        return f"Rng Object: Seed: {self._seed} | Key: {self._key}"
+
+    @property
+    def seed(self):
+        return self._seed
+
+    @property
+    def key(self) -> tuple:
+        return self._key
+
+    @property
+    def generator(self):
+        """
+        The NumPy Generator of this stream, None if NumPy is not installed.
+        """
+        return self._np
+
+    def randints(self, low:int, high:int, n:int) -> List[int]:
+        """
+        Draw n integers between low and high, inclusive, in one call.
+        """
+        if self._np is not None:
+            return self._np.integers(low, high + 1, size=n).tolist()
+        return self._random.choices(range(low, high + 1), k=n)
+
+    def randoms(self, n:int) -> List[float]:
+        """
+        Draw n floats in [0, 1) in one call.
+        """
+        if self._np is not None:
+            return self._np.random(n).tolist()
+        rand = self._random.random
+        return [rand() for _ in range(n)]
+
+    def spawn(self, n:int=1) -> List['Rng']:
+        """
+        Create n independent child streams. Children are decided by the seed
+        and spawn order, so spawning from the same seed gives the same
+        children every time.
+        """
+        children = [Rng(self._seed, self._key + (self._spawned + i,))
+            for i in range(n)]
+        self._spawned += n
+        return children
 
 class Die():
     ''' The just a bit overengineered die class 
@@ -71,12 +168,14 @@ class Die():
         r_str += f" Current: {self.current_val}"
         return r_str
 
-    def roll(self) -> int:
+    def roll(self, rng:Optional[Rng]=None) -> int:
         '''
         Roll the die and set current face value, returns current face. 
+        :param rng: Rng. Stream to roll with, the random module if None.
         :return: int. current value of die after roll
         '''
-        self.current_val = randint(self.min, self.max)
+        self.current_val = (rng.randint(self.min, self.max) if rng
+            else randint(self.min, self.max))
         return self.current_val
 
     def getCurrent(self) -> int:
@@ -86,7 +185,262 @@ class Die():
         '''
         return self.current_val
 
-def parse_rolls(rollnote:str) -> Optional[Dict]:
+class RollSpec(NamedTuple):
+    """
+    An immutable, pre-parsed roll notation. Created with compile_roll() so the
+    regex work is only ever done once per notation.
+
+    :param notation: str. The original roll notation.
+    :param count: int. Amount of dice to roll.
+    :param sides: int. Amount of sides on each die.
+    :param keep: str. 'kh' or 'kl' if the notation keeps dice, otherwise None.
+    :param keep_count: int. Amount of dice to keep. Equal to count if the
+        notation does not keep dice.
+    :param op: str. Modifier operation '+', '-', '*' or '/', otherwise None.
+    :param mod: int. Modifier value, 0 if there is no modifier.
+    """
+    notation: str
+    count: int
+    sides: int
+    keep: Optional[str]
+    keep_count: int
+    op: Optional[str]
+    mod: int
+
+    def roll(self, verbose:bool=False,
+        rng:Optional[Rng]=None) -> Union[Dict, int]:
+        """
+        Roll the compiled notation. See sum_roll() for the returned values.
+        """
+        if self.count >= BIG_POOL_THRESHOLD:
+            return self.rollPool(verbose, rng)
+
+        if rng is None:
+            rolls = [randint(1, self.sides) for _ in range(self.count)]
+        elif self.count == 1:
+            rolls = [rng.randint(1, self.sides)]
+        else:
+            rolls = rng.randints(1, self.sides, self.count)
+        rolls.sort()
+        kept = self.keepRolls(rolls)
+        total = self.applyMod(sum(kept))
+
+        if not verbose:
+            return total
+        return {
+            "notation": self.notation,
+            "rolls": rolls,
+            "keep": kept,
+            "mod": self.op + str(self.mod) if self.op else None,
+            "result": total
+        }
+
+    def rollPool(self, verbose:bool=False,
+        rng:Optional[Rng]=None) -> Union[Dict, int]:
+        """
+        Roll the compiled notation without building a list of every die.
+
+        When there are more dice than sides, the amount of dice showing each
+        face is drawn directly as a multinomial, so the cost follows the
+        amount of sides. Otherwise the dice are streamed in chunks and kept
+        dice are picked with a heap. With verbose, 'rolls' and 'keep' are
+        {face: amount of dice} dicts instead of lists.
+        """
+        keep_count = min(self.keep_count, self.count)
+        if self.sides <= self.count:
+            counts = _face_counts(self.count, self.sides, rng)
+        elif verbose:
+            counts = Counter(_stream_dice(self.count, self.sides, rng))
+        else:
+            dice = _stream_dice(self.count, self.sides, rng)
+            if keep_count == self.count:
+                return self.applyMod(sum(dice))
+            if self.keep == 'kl':
+                return self.applyMod(sum(heapq.nsmallest(keep_count, dice)))
+            return self.applyMod(sum(heapq.nlargest(keep_count, dice)))
+
+        kept = self.keepCounts(counts)
+        total = self.applyMod(sum(f * c for f, c in kept.items()))
+
+        if not verbose:
+            return total
+        return {
+            "notation": self.notation,
+            "rolls": {f: counts[f] for f in sorted(counts) if counts[f]},
+            "keep": {f: kept[f] for f in sorted(kept)},
+            "mod": self.op + str(self.mod) if self.op else None,
+            "result": total
+        }
+
+    def keepCounts(self, counts:Dict[int, int]) -> Dict[int, int]:
+        """
+        Given {face: amount of dice}, return {face: amount of dice kept}.
+        """
+        left = min(self.keep_count, self.count)
+        kept = {}
+        for face in sorted(counts, reverse=self.keep != 'kl'):
+            if left <= 0:
+                break
+            take = min(counts[face], left)
+            if take:
+                kept[face] = take
+                left -= take
+        return kept
+
+    def keepRolls(self, rolls:List[int]) -> List[int]:
+        """
+        Given a sorted list of rolls, return the rolls that are kept.
+        """
+        if self.keep == 'kl':
+            return rolls[:self.keep_count]
+        return rolls[max(len(rolls) - self.keep_count, 0):]
+
+    def applyMod(self, total:int) -> int:
+        """
+        Apply the modifier of the notation to a summed roll.
+        """
+        if self.op == '+':
+            return total + self.mod
+        if self.op == '-':
+            return total - self.mod
+        if self.op == '*':
+            return total * self.mod
+        if self.op == '/':
+            return total // self.mod
+        return total
+
+def _binomial(n:int, p:float, rand) -> int:
+    """
+    Draw from a binomial distribution of n trials with success chance p.
+
+    Small means are drawn by inversion with geometric skips, larger ones by
+    Hormann's BTRS rejection method, so the cost does not grow with n.
+
+    :param rand: Function returning a float in [0, 1).
+    """
+    if n <= 0 or p <= 0.0:
+        return 0
+    if p >= 1.0:
+        return n
+    if p > 0.5:
+        return n - _binomial(n, 1.0 - p, rand)
+
+    if n * p < 10.0:
+        c = log(1.0 - p)
+        x = y = 0
+        while True:
+            y += floor(log(1.0 - rand()) / c) + 1
+            if y > n:
+                return x
+            x += 1
+
+    q = 1.0 - p
+    spq = sqrt(n * p * q)
+    b = 1.15 + 2.53 * spq
+    a = -0.0873 + 0.0248 * b + 0.01 * p
+    c = n * p + 0.5
+    vr = 0.92 - 4.2 / b
+    alpha = (2.83 + 5.1 / b) * spq
+    lpq = log(p / q)
+    m = floor((n + 1) * p)
+    h = lgamma(m + 1) + lgamma(n - m + 1)
+    while True:
+        u = rand() - 0.5
+        v = rand()
+        us = 0.5 - abs(u)
+        k = floor((2 * a / us + b) * u + c) if us else -1
+        if k < 0 or k > n:
+            continue
+        if us >= 0.07 and v <= vr:
+            return k
+        if not v:
+            continue
+        v = log(v * alpha / (a / (us * us) + b))
+        if v <= h - lgamma(k + 1) - lgamma(n - k + 1) + (k - m) * lpq:
+            return k
+
+def _face_counts(count:int, sides:int, rng:Optional[Rng]=None) -> Dict[int, int]:
+    """
+    Roll count dice and return {face: amount of dice showing it}, drawn as a
+    multinomial without rolling each die.
+    """
+    generator = rng.generator if rng else _np_rng
+    if generator is not None:
+        drawn = generator.multinomial(count, [1.0 / sides] * sides)
+        return {f: int(c) for f, c in enumerate(drawn, start=1)}
+
+    rand = rng.random if rng else random.random
+    counts = {}
+    left = count
+    for face in range(1, sides):
+        counts[face] = _binomial(left, 1.0 / (sides - face + 1), rand)
+        left -= counts[face]
+    counts[sides] = left
+    return counts
+
+def _stream_dice(count:int, sides:int, rng:Optional[Rng]=None):
+    """
+    Yield count rolled dice, drawing POOL_CHUNK_SIZE dice at a time.
+    """
+    left = count
+    while left > 0:
+        size = min(left, POOL_CHUNK_SIZE)
+        if rng:
+            yield from rng.randints(1, sides, size)
+        else:
+            for _ in range(size):
+                yield randint(1, sides)
+        left -= size
+
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def _compile(rollnote:str) -> Optional[RollSpec]:
+    """
+    Cached worker for compile_roll(). Only ever called with a str.
+    """
+    if not is_valid(rollnote):
+        return None
+
+    rolls = re_rolls.match(rollnote)
+    keeps = re_keeps.search(rollnote)
+    mods = re_mods.search(rollnote)
+
+    count, sides = int(rolls.group(1)), int(rolls.group(2))
+    if sides < 1:
+        return None
+    if mods and mods.group(1) == '/' and int(mods.group(2)) == 0:
+        return None
+
+    return RollSpec(
+        notation=rollnote,
+        count=count,
+        sides=sides,
+        keep=keeps.group(1).lower() if keeps else None,
+        keep_count=int(keeps.group(2)) if keeps else count,
+        op=mods.group(1) if mods else None,
+        mod=int(mods.group(2)) if mods else 0
+    )
+
+def compile_roll(rollnote:str, logs:bool=False) -> Optional[RollSpec]:
+    """
+    Compile a roll notation string into a RollSpec.
+
+    Compiled notations are kept in a bounded LRU cache, so compiling the same
+    notation again is a single dictionary lookup.
+
+    :param rollnote: The roll notation to compile.
+    :return: RollSpec. The compiled roll, or None if the notation is invalid.
+    """
+    if not isinstance(rollnote, str):
+        if logs:
+            main_logger.error(f"Invalid type {type(rollnote)}. Expected type "
+                + "str.")
+        return None
+    spec = _compile(rollnote)
+    if not spec and logs:
+        main_logger.error(f"Invalid roll notation passed {rollnote}.")
+    return spec
+
+def parse_rolls(rollnote:str, logs:bool=False) -> Optional[Dict]:
     """
     Parse a roll notation string for dice rolls.
 
@@ -98,32 +452,14 @@ def parse_rolls(rollnote:str) -> Optional[Dict]:
     :return: a dictionary containing the list of rolls ('rolls') or None if no
         rolls are found in the roll notation.
     """
-    if not isinstance(rollnote, str):
-        if self._logging:
-            main_logger.error(f"Invalid type {type(rollnote)}. Expected type "
-                + "str.")
-        return None
-    if not rollnote:
-        if self._logging:
-            main_logger.error(f"Empty str. Expected str containing roll" + 
-                "notation.")
-        return None
-    if not is_valid(rollnote):
-        if self._logging:
-            main_logger.error(f"Invalid roll notation passed {rollnote}.")
+    spec = compile_roll(rollnote, logs=logs)
+    if not spec:
         return None
 
-    rolls = re_rolls.search(rollnote)
-    
-    if not is_valid(rollnote):
-        return None
-    if not rolls:
-        return None
-    
-    return {'rolls': [randint(1, 
-        int(rolls.groups()[1])) for _ in range(int(rolls.groups()[0]))]}
+    return {'rolls': [randint(1, spec.sides) for _ in range(spec.count)]}
 
-def parse_keeps(rollnote:str, rolls:List[int]) -> Optional[Dict]:
+def parse_keeps(rollnote:str, rolls:List[int],
+    logs:bool=False) -> Optional[Dict]:
     """
     Parse a roll notation string for keep highests/lowest 
     
@@ -138,37 +474,25 @@ def parse_keeps(rollnote:str, rolls:List[int]) -> Optional[Dict]:
         in the roll notation.
     """
     if not all(isinstance(r, int) for r in rolls):
-        if self._logging:
+        if logs:
             main_logger.error(f"Invalid type passed in rolls. Expected list of "
             + "int types.")
         return None
-    if not isinstance(rollnote, str):
-        if self.logging:
-            main_logger.error(f"Invalid type {type(rollnote)}. Expected type "
-            + "str.")
-        return None
-    if not rollnote:
-        if self._logging:
-            main_logger.error(f"Empty str. Expected str containing roll "
-            + "notation.")
-        return None
-    if not is_valid(rollnote):
-        if self._logging:
-            main_logger.error(f"Invalid roll notation passed {rollnote}.")
+    spec = compile_roll(rollnote, logs=logs)
+    if not spec:
         return None
 
-    keeps = re_keeps.search(rollnote)
-    if not keeps:
+    if not spec.keep:
         return {'keep': 'kh', 'value': len(rolls)}
-    if not (int(keeps.groups()[1]) <= len(rolls)):
-        if self._logging:
+    if not spec.keep_count <= len(rolls):
+        if logs:
             main_logger.error(f"Length of found groups longer than length of" 
             + " rolls.")
         return None
 
-    return {'keep': keeps.groups()[0], 'value': int(keeps.groups()[1])}
+    return {'keep': spec.keep, 'value': spec.keep_count}
 
-def parse_mods(rollnote:str) -> Optional[Dict]:
+def parse_mods(rollnote:str, logs:bool=False) -> Optional[Dict]:
     """ 
     Parse a roll notation for modifiers
     
@@ -181,23 +505,14 @@ def parse_mods(rollnote:str) -> Optional[Dict]:
         ('value') if a modifier is found or None if no modifier is present in 
         the roll notation.
     """
-    if not isinstance(rollnote, str):
-        if self._logging:
-            main_logger.error(f"Invalid type {type(rollnote)}. Expected type "
-            + "str.")
-        return None
-    if not is_valid(rollnote):
-        if self._logging:
-            main_logger.error(f"Invalid roll notation passed {rollnote}.")
+    spec = compile_roll(rollnote, logs=logs)
+    if not spec or not spec.op:
         return None
 
-    mods = re_mods.search(rollnote)
-    if not mods:
-        return None
+    return {'op': spec.op, 'value': spec.mod}
 
-    return {'op': mods.groups()[0], 'value': int(mods.groups()[1])}
-
-def sum_roll(rollnote:str, verbose:bool=False) -> Union[Dict, int]:
+def sum_roll(rollnote:Union[str, RollSpec], verbose:bool=False,
+    logs:bool=False, rng:Optional[Rng]=None) -> Union[Dict, int]:
     """ 
     Evaluate a roll notation and return the result.
 
@@ -208,72 +523,330 @@ def sum_roll(rollnote:str, verbose:bool=False) -> Union[Dict, int]:
     - '+Z', '-Z', '*Z', '/Z': Add (or subtract, multiply, or divide) Z to the 
         result.
 
-    :param rollnote: The roll notation to evaluate.
+    :param rollnote: The roll notation to evaluate, or a RollSpec returned by
+        compile_roll().
     :param verbose: If True, return a dictionary with all results.
+    :param rng: Rng. Stream to roll with, the random module if None.
     :return: The result of the roll notation evalluation.
     """ 
-    if not isinstance(rollnote, str):
-        if self._logging:
-            main_logger.error("Invalid type passed as roll notation:"
-            + f"{type(rollnote)}. Expected type str")
-        return None
     if not isinstance(verbose, bool):
-        if self._logging:
+        if logs:
             main_logger.error(f"Invalid type passed as verbose: {type(verbose)}."
             + "Expected tyoe bool")
         return None
-    if not is_valid(rollnote):
-        if self._logging:
-            main_logger.error(f"Passed roll notation {rollnote} is not valid.")
+
+    spec = (rollnote if isinstance(rollnote, RollSpec)
+        else compile_roll(rollnote, logs=logs))
+    if not spec:
         return None
 
-    rolls = parse_rolls(rollnote)
-    keeps = parse_keeps(rollnote, rolls['rolls'])
-    mods = parse_mods(rollnote)
+    return spec.roll(verbose, rng)
 
-    if not rolls: 
+def sum_roll_many(rollnote:Union[str, RollSpec], n:int, verbose:bool=False,
+    logs:bool=False, rng:Optional[Rng]=None):
+    """
+    Evaluate a roll notation n times in one batch.
+
+    When NumPy is installed all dice are drawn at once as an (n x count)
+    matrix and keep highest/lowest is done with a partition along each row.
+    Without NumPy every roll is made with RollSpec.roll(). Either way each
+    result follows the same rules as sum_roll().
+
+    :param rollnote: The roll notation to evaluate, or a RollSpec.
+    :param n: int. Amount of times to roll the notation.
+    :param verbose: If True, return a dictionary with the per die matrix
+        ('rolls'), the kept dice ('keep'), the modifier ('mod') and the
+        results ('result').
+    :param rng: Rng. Stream to roll with. The module streams if None.
+    :return: A NumPy array of n results, or a list of n results if NumPy is
+        not installed. None if the notation or n is invalid.
+    """
+    if not isinstance(n, int) or isinstance(n, bool) or n < 0:
+        if logs:
+            main_logger.error(f"Invalid amount of rolls {n}. Expected int "
+                + "of 0 or more.")
+        return None
+    if not isinstance(verbose, bool):
+        if logs:
+            main_logger.error(f"Invalid type passed as verbose: {type(verbose)}."
+            + "Expected tyoe bool")
         return None
 
-    #sort rolls and start results dict
-    rolls['rolls'].sort()
-    results = {
-        "notation": rollnote,
-        "rolls": rolls['rolls'],
-        "keep": None,
-        "mod": None,
-        "result": None
-    }
+    spec = (rollnote if isinstance(rollnote, RollSpec)
+        else compile_roll(rollnote, logs=logs))
+    if not spec:
+        return None
 
-    # store the kept rolls
-    if keeps:
-        if keeps['keep'] == 'kh':
-            results['keep'] = results['rolls'][-keeps['value']:]
-        if keeps['keep'] == 'kl':
-            results['keep'] = results['rolls'][:keeps['value']]
-    # Sum the rolls
-    if results['keep']:
-        results['result'] = sum(results['keep'])
+    if np is None:
+        rolled = [spec.roll(verbose, rng) for _ in range(n)]
+        if not verbose:
+            return rolled
+        return {
+            "notation": spec.notation,
+            "rolls": [r['rolls'] for r in rolled],
+            "keep": [r['keep'] for r in rolled],
+            "mod": rolled[0]['mod'] if rolled else None,
+            "result": [r['result'] for r in rolled]
+        }
+
+    generator = rng.generator if rng else _np_rng
+    keep_count = min(spec.keep_count, spec.count)
+    if spec.count >= BIG_POOL_THRESHOLD and spec.sides <= spec.count:
+        return _sum_pool_many(spec, n, verbose, generator)
+
+    rolls = generator.integers(1, spec.sides + 1, size=(n, spec.count))
+    if verbose:
+        rolls.sort(axis=1)
+        kept = spec.keepRolls(rolls.T).T
+    elif keep_count == spec.count:
+        kept = rolls
+    elif keep_count == 0:
+        kept = rolls[:, :0]
+    elif spec.keep == 'kl':
+        kept = np.partition(rolls, keep_count - 1, axis=1)[:, :keep_count]
     else:
-        results['result'] = sum(results['rolls'])
-    # Apply modifier if any
-    if mods:
-        if mods['op'] == '+':
-            results['result'] = results['result'] + mods['value']
-            results['mod'] = mods['op'] + str(mods['value'])
-        if mods['op'] == '-':
-            results['result'] = results['result'] - mods['value']
-            results['mod'] = mods['op'] + str(mods['value'])
-        if mods['op'] == '*':
-            results['result'] = results['result'] * mods['value']
-            results['mod'] = mods['op'] + str(mods['value'])
-        if mods['op'] == '/': 
-            results['result'] = results['result'] // mods['value']
-            results['mod'] = mods['op'] + str(mods['value'])
+        kept = np.partition(rolls, spec.count - keep_count,
+            axis=1)[:, spec.count - keep_count:]
+    results = spec.applyMod(kept.sum(axis=1))
 
-    if verbose:
+    if not verbose:
         return results
+    return {
+        "notation": spec.notation,
+        "rolls": rolls,
+        "keep": kept,
+        "mod": spec.op + str(spec.mod) if spec.op else None,
+        "result": results
+    }
+
+class Distribution:
+    """
+    The exact probability distribution of a roll notation. Created with
+    distribution(). Outcomes are stored as whole number counts out of
+    sides ** count equally likely rolls, so every query is exact up to the
+    final float division.
+    """
+    def __init__(self, spec:RollSpec, counts:Dict[int, int], total:int) -> None:
+        """
+        Initialize the distribution from outcome counts.
+
+        :param spec: RollSpec the distribution was computed for.
+        :param counts: dict. {result: amount of rolls giving that result}
+        :param total: int. Amount of possible rolls, the sum of all counts.
+        """
+        self.spec = spec
+        self.total = total
+        self.values = sorted(counts)
+        self.counts = [counts[v] for v in self.values]
+        self._cumulative = []
+        running = 0
+        for c in self.counts:
+            running += c
+            self._cumulative.append(running)
+
+        # Integer moments keep huge dice pools from overflowing a float.
+        s1 = sum(v * c for v, c in zip(self.values, self.counts))
+        s2 = sum(v * v * c for v, c in zip(self.values, self.counts))
+        self.mean = s1 / total
+        self.variance = (s2 * total - s1 * s1) / (total * total)
+
+    def __str__(self):
+        return (f"Distribution {self.spec.notation}: Min: {self.min} | "
+            + f"Max: {self.max} | Mean: {self.mean:.3f}")
+
+    @property
+    def min(self) -> int:
+        return self.values[0]
+
+    @property
+    def max(self) -> int:
+        return self.values[-1]
+
+    @property
+    def stdev(self) -> float:
+        return self.variance ** 0.5
+
+    def pmf(self, value:int) -> float:
+        """
+        :return: float. Probability of rolling exactly value.
+        """
+        i = bisect_left(self.values, value)
+        if i < len(self.values) and self.values[i] == value:
+            return self.counts[i] / self.total
+        return 0.0
+
+    def cdf(self, value:int) -> float:
+        """
+        :return: float. Probability of rolling value or lower.
+        """
+        i = bisect_right(self.values, value)
+        return self._cumulative[i - 1] / self.total if i else 0.0
+
+    def probAtLeast(self, value:int) -> float:
+        """
+        :return: float. Probability of rolling value or higher.
+        """
+        i = bisect_left(self.values, value)
+        below = self._cumulative[i - 1] if i else 0
+        return (self.total - below) / self.total
+
+    def probAtMost(self, value:int) -> float:
+        """
+        :return: float. Probability of rolling value or lower.
+        """
+        return self.cdf(value)
+
+    def countAtMost(self, value:int) -> int:
+        """
+        :return: int. Amount of rolls, out of total, of value or lower.
+        """
+        i = bisect_right(self.values, value)
+        return self._cumulative[i - 1] if i else 0
+
+    def valueAtCount(self, count:int) -> int:
+        """
+        Inverse of countAtMost(). Lets a uniform draw in [0, total) be mapped
+        to a result.
+        :return: int. The lowest result with more than count rolls at or
+            below it.
+        """
+        i = bisect_right(self._cumulative, count)
+        return self.values[min(i, len(self.values) - 1)]
+
+    def toDict(self) -> Dict[int, float]:
+        """
+        :return: dict. {result: probability} for every possible result.
+        """
+        return {v: c / self.total for v, c in zip(self.values, self.counts)}
+
+def _convolve(a:List[int], b:List[int]) -> List[int]:
+    """
+    Multiply two polynomials given as lists of coefficients.
+    """
+    out = [0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        if x:
+            for j, y in enumerate(b):
+                out[i + j] += x * y
+    return out
+
+def _sum_counts(count:int, sides:int) -> Dict[int, int]:
+    """
+    Outcome counts for the sum of count dice, by repeated squaring of the
+    single die polynomial.
+    """
+    result, base, n = [1], [0] + [1] * sides, count
+    while n:
+        if n & 1:
+            result = _convolve(result, base)
+        n >>= 1
+        if n:
+            base = _convolve(base, base)
+    return {v: c for v, c in enumerate(result) if c}
+
+def _keep_counts(count:int, sides:int, keep:str, keep_count:int) -> Dict[int, int]:
+    """
+    Outcome counts for the sum of the highest (kh) or lowest (kl) keep_count
+    of count dice.
+
+    Faces are walked from the kept end. The state is the amount of dice
+    already placed on walked faces and the sum of the kept dice. Once
+    keep_count dice are placed, the rest can show any face not yet walked,
+    which is counted in closed form instead of being walked.
+    """
+    faces = range(sides, 0, -1) if keep == 'kh' else range(1, sides + 1)
+    final = {}
+    states = {(0, 0): 1}
+    for walked, face in enumerate(faces, start=1):
+        unwalked = sides - walked
+        next_states = {}
+        for (used, total), ways in states.items():
+            left = count - used
+            # With no faces left every remaining die must show this face.
+            first = left if not unwalked else 0
+            for c in range(first, left + 1):
+                placed = used + c
+                kept = total + min(c, keep_count - used) * face
+                w = ways * comb(left, c)
+                if placed >= keep_count:
+                    w *= unwalked ** (count - placed)
+                    final[kept] = final.get(kept, 0) + w
+                else:
+                    key = (placed, kept)
+                    next_states[key] = next_states.get(key, 0) + w
+        states = next_states
+        if not states:
+            break
+    return final
+
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def _distribution(spec:RollSpec) -> Distribution:
+    """
+    Cached worker for distribution(). Only ever called with a RollSpec.
+    """
+    keep_count = min(spec.keep_count, spec.count)
+    if keep_count == spec.count:
+        counts = _sum_counts(spec.count, spec.sides)
+    elif keep_count == 0:
+        counts = {0: spec.sides ** spec.count}
     else:
-        return results['result']
+        counts = _keep_counts(spec.count, spec.sides, spec.keep, keep_count)
+
+    if spec.op:
+        modded = {}
+        for v, c in counts.items():
+            m = spec.applyMod(v)
+            modded[m] = modded.get(m, 0) + c
+        counts = modded
+
+    return Distribution(spec, counts, spec.sides ** spec.count)
+
+def distribution(rollnote:Union[str, RollSpec],
+    logs:bool=False) -> Optional[Distribution]:
+    """
+    Compute the exact probability distribution of a roll notation.
+
+    Plain sums are found by convolution, keep highest/lowest by a dynamic
+    program over the faces of the dice. Distributions are cached per compiled
+    notation, so repeated queries do not recompute anything.
+
+    :param rollnote: The roll notation to evaluate, or a RollSpec.
+    :return: Distribution of the notation, or None if the notation is invalid.
+    """
+    spec = (rollnote if isinstance(rollnote, RollSpec)
+        else compile_roll(rollnote, logs=logs))
+    if not spec:
+        return None
+    return _distribution(spec)
+
+def _sum_pool_many(spec:RollSpec, n:int, verbose:bool, generator):
+    """
+    NumPy batch of big pool rolls. Draws an (n x sides) matrix of face counts
+    instead of an (n x count) matrix of dice. With verbose, 'rolls' and 'keep'
+    are face count matrices where column i holds face i + 1.
+    """
+    counts = generator.multinomial(spec.count,
+        [1.0 / spec.sides] * spec.sides, size=n)
+    faces = np.arange(1, spec.sides + 1)
+    keep_count = min(spec.keep_count, spec.count)
+
+    # Walk the faces from the kept end, keeping what is left of keep_count.
+    walk = counts if spec.keep == 'kl' else counts[:, ::-1]
+    before = np.cumsum(walk, axis=1) - walk
+    kept = np.minimum(walk, np.maximum(keep_count - before, 0))
+    if spec.keep != 'kl':
+        kept = kept[:, ::-1]
+    results = spec.applyMod(kept @ faces)
+
+    if not verbose:
+        return results
+    return {
+        "notation": spec.notation,
+        "rolls": counts,
+        "keep": kept,
+        "mod": spec.op + str(spec.mod) if spec.op else None,
+        "result": results
+    }
 
 def is_valid(rollnote:str) -> bool:
     """
@@ -6,12 +6,194 @@
     - write to new file
 """
 from logger import setup_logger
+from models import Table
+import packed_store
+import sqlite_store
 import yaml, json
+import asyncio
 import glob
+import hashlib
 import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 main_logger, models_logger, fhandler_logger = setup_logger()
 
+# Table files are plain data, so they are read with a safe loader. The libyaml
+# C loader is much faster and is used when PyYAML was built with it.
+try:
+    from yaml import CSafeLoader as YamlLoader
+    YAML_BACKEND = "libyaml"
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+    YAML_BACKEND = "python"
+
+STR_TAG = "tag:yaml.org,2002:str"
+INT_TAG = "tag:yaml.org,2002:int"
+
+class TableLoader(YamlLoader):
+    """
+    YAML loader that builds a Table from each table document while parsing,
+    without constructing a dictionary of the whole document. Documents that
+    are not valid tables are constructed as usual, so the caller can report
+    them. filename is set before loading and given to each Table.
+    """
+    filename = ""
+
+    def construct_document(self, node):
+        table = None
+        if isinstance(node, yaml.MappingNode):
+            table = self.constructTable(node)
+        if table is None:
+            return super().construct_document(node)
+        self.constructed_objects = {}
+        self.recursive_objects = {}
+        return table
+
+    def constructTable(self, node) -> Table:
+        """
+        Build a Table from the mapping node of a document.
+        :return: Table, None if the document is not a valid table.
+        """
+        self.flatten_mapping(node)
+        fields = {}
+        for key_node, value_node in node.value:
+            key = self.construct_object(key_node)
+            if key == 'results':
+                if not isinstance(value_node, yaml.MappingNode):
+                    return None
+                self.flatten_mapping(value_node)
+                fields[key] = [(self.constructValue(k),
+                    self.constructValue(v)) for k, v in value_node.value]
+            elif key in ('table-name', 'roll', 'group'):
+                fields[key] = self.construct_object(value_node)
+        if not all(key in fields for key in ('table-name', 'roll', 'results')):
+            return None
+        return Table.fromEntries(fields['table-name'], fields['roll'],
+            fields['results'], fields.get('group', ""), self.filename)
+
+    def constructValue(self, node):
+        """
+        Construct a results key or value. Plain strings and numbers, nearly
+        every node of a table, skip the generic constructor.
+        """
+        if isinstance(node, yaml.ScalarNode):
+            if node.tag == STR_TAG:
+                return node.value
+            if (node.tag == INT_TAG and node.value.isdigit()
+            and not node.value.startswith("0")):
+                return int(node.value)
+        return self.construct_object(node, deep=True)
+
+def tableObjectHook(loaded:dict, filename:str=""):
+    """
+    json object_hook building a Table from each object with the keys of a
+    table while the file is parsed, other objects and invalid tables stay
+    dictionaries.
+    """
+    if 'table-name' in loaded and 'roll' in loaded and 'results' in loaded:
+        table = Table.fromEntries(loaded['table-name'], loaded['roll'],
+            loaded['results'], loaded.get('group', ""), filename)
+        if table is not None:
+            return table
+    return loaded
+
+def loadTableDocuments(stream, filename:str=""):
+    """
+    Yield each document of a YAML stream, table documents as Table objects.
+    """
+    loader = TableLoader(stream)
+    loader.filename = filename
+    try:
+        while loader.check_data():
+            yield loader.get_data()
+    finally:
+        loader.dispose()
+
+# Directory, next to the table files, holding table caches
+CACHE_DIR = ".tablecache"
+# Bumped whenever the cached form of Table changes, older caches are rebuilt
+CACHE_VERSION = 3
+
+# Files read and parsed at once by FileHandler.load_files_async()
+ASYNC_CONCURRENCY = 4
+
+# YAML document start marker in the raw bytes of a file, '---' alone or
+# followed by a space, so lines such as '----' do not split a document
+re_document_start = re.compile(rb"^---(?:[ \t]|\r?$)", re.M)
+
+def splitDocuments(data:bytes) -> list:
+    """
+    Split the raw bytes of a YAML file where each document starts. Text
+    before the first marker is a document of its own.
+    :return: list. (offset, document bytes) of each document, in file order.
+    """
+    starts = [m.start() for m in re_document_start.finditer(data)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    ends = starts[1:] + [len(data)]
+    return [(start, data[start:end]) for start, end in zip(starts, ends)]
+
+def fileStamp(path:str) -> tuple:
+    """
+    Modification time and size of a file, used to tell when it changed.
+    :return: tuple. (st_mtime_ns, st_size), None if the file is missing.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def tablesByName(documents) -> tuple:
+    """
+    Collect the table documents of a YAML file by name. Documents that are
+    not mappings are skipped, as are mappings without a table-name.
+    :return: tuple. (dictionary of tables, amount of mappings missing
+    table-name)
+    """
+    loaded = {}
+    missing = 0
+    for each in documents:
+        if not isinstance(each, dict):
+            continue
+        if 'table-name' not in each:
+            missing += 1
+            continue
+        loaded[each['table-name']] = each
+    return loaded, missing
+
+def parseText(text:str, ext:str) -> tuple:
+    """
+    Parse the text of a table file into a dictionary of tables by name. Used
+    by FileHandler.loadFiles() and its worker processes. As with
+    FileHandler.iterTables(), the YAML documents before an error are kept.
+    :return: tuple. (dictionary of tables, parser backend, seconds spent
+    parsing, amount of tables missing table-name, error message or None)
+    """
+    backend = "json" if ext == 'json' else YAML_BACKEND
+    start = time.perf_counter()
+    if ext == 'json':
+        try:
+            loaded = json.loads(text)
+            if not isinstance(loaded, dict):
+                raise ValueError("Expected an object of tables by name.")
+        except ValueError as e:
+            return {}, backend, time.perf_counter() - start, 0, str(e)
+        return loaded, backend, time.perf_counter() - start, 0, None
+
+    documents = []
+    error = None
+    try:
+        for each in yaml.load_all(text, Loader=YamlLoader):
+            documents.append(each)
+    except yaml.YAMLError as e:
+        error = str(e)
+    loaded, missing = tablesByName(documents)
+    return loaded, backend, time.perf_counter() - start, missing, error
+
 class FileHandler:
     """
     Class dealing with reading, writing, and verifying files.
@@ -28,6 +210,8 @@ class FileHandler:
         self._working_dir = current_dir
         self._exts = exts
         self._logging = logs
+        # Path of each parsed file to (parser backend, seconds spent parsing)
+        self._parse_stats = {}
 
         if self._logging:
             fhandler_logger.debug("FileHandler initialized.")
@@ -40,6 +224,27 @@ class FileHandler:
     def setDirectory(self, dir):
         self._working_dir = dir
 
+    @property
+    def exts(self) -> list:
+        return self._exts
+
+    @property
+    def parseStats(self) -> dict:
+        """
+        Parser backend and seconds spent parsing for every file parsed, by
+        path. YAML files are parsed by 'libyaml' or 'python', JSON by 'json'.
+        """
+        return self._parse_stats
+
+    def recordParse(self, path:str, backend:str, seconds:float) -> None:
+        """
+        Record the parser backend and time spent parsing a file.
+        """
+        self._parse_stats[path] = (backend, seconds)
+        if self._logging:
+            fhandler_logger.debug(f"Parsed {path} with {backend} in"
+            + f" {seconds * 1000:.1f} ms")
+
     def loadFile(self, filename, dir="") -> dict:
         """
         Given a filename and optionally a directory, read the file in and parse
@@ -69,32 +274,423 @@ class FileHandler:
 
         return out_data
 
-    def loadFiles(self, dir="") -> list:
+    def loadFiles(self, dir="", workers:int=1) -> list:
         """
         Given a directory path, read in all files within the dir and attempt to
         read all the files into a list as dictionarys and return that list.
+        With more than one worker, files are read by a pool of threads and
+        parsed by a pool of processes. Each file is parsed once.
         :param dir: str. Path to the directory to load files from.
-        :return: list. List of dictionaries read in from files.
+        :param workers: int. Amount of threads and processes to load with.
+        :return: list. List of dictionaries read in from files, in file name
+        order.
+        """
+        d = self._working_dir if not dir else dir
+        return self.parseFiles(self.listFiles(d), d, workers)
+
+    def listFiles(self, dir:str="") -> list:
+        """
+        List the names of the files within a directory that have an accepted
+        extention, in sorted order.
+        """
+        d = self._working_dir if not dir else dir
+        return sorted(os.path.basename(f)
+            for f in glob.glob(os.path.join(d, '*.*'))
+            if os.path.isfile(f) and f.split('.')[-1] in self._exts)
+
+    def parseFiles(self, files:list, dir:str="", workers:int=1,
+        failed:set=None) -> list:
+        """
+        Read and parse the given files of a directory with parseText(). The
+        result does not depend on the amount of workers.
+        :param files: list. Names of the files to load.
+        :param workers: int. Amount of threads reading files and processes
+        parsing them. Files are parsed one after another with parseFile() if
+        1 or less.
+        :param failed: set. If given, the names of files that could not be
+        read or had errors are added to it.
+        :return: list. Dictionary of tables by name read in from each file,
+        in the same order.
+        """
+        d = self._working_dir if not dir else dir
+        if workers <= 1 or len(files) < 2:
+            return [self.parseFile(f, d, failed) for f in files]
+
+        paths = [os.path.join(d, f) for f in files]
+        with ThreadPoolExecutor(workers) as io_pool, \
+        ProcessPoolExecutor(workers) as parse_pool:
+            reads = [io_pool.submit(self.readText, path) for path in paths]
+            # Each file is handed to the parsers as soon as it is read
+            parses = []
+            for path, read in zip(paths, reads):
+                text = read.result()
+                parses.append(None if text is None else
+                    parse_pool.submit(parseText, text, path.split('.')[-1]))
+            return [self._collectParse(filename, path,
+                None if parse is None else parse.result(), failed)
+                for filename, path, parse in zip(files, paths, parses)]
+
+    def parseFile(self, filename:str, dir:str="", failed:set=None) -> dict:
+        """
+        Read and parse a single file with parseText(), as the worker
+        processes of parseFiles() do.
+        :param failed: set. If given, the name of the file is added to it if
+        it could not be read or had errors.
+        :return: dict. Tables by name, the ones parsed before an error if the
+        file is only partly valid, empty if it could not be read.
         """
         d = self._working_dir if not dir else dir
-        all_files = glob.glob(os.path.join(dir, '*.*'))
-        all_dicts = []
-        for file in all_files:
-            print(file)
-            if os.path.isfile(file) and file.split('.')[-1] in self._exts:
-                if self._logging: 
-                    fhandler_logger.debug(f"Loaded {file}")
-                all_dicts.append(self.loadFile(file, d))
-
-                ext = file.split('.')[-1]
-                if ext == 'yaml' or ext == 'yml':
-                    all_dicts.append(self.readYamlToDict(file))
-                elif ext == 'json':
-                    out_data = self.readJsonToDict(path)
+        path = os.path.join(d, filename)
+        text = self.readText(path)
+        return self._collectParse(filename, path, None if text is None
+            else parseText(text, filename.split('.')[-1]), failed)
+
+    def _collectParse(self, filename:str, path:str, parsed:tuple,
+        failed:set=None) -> dict:
+        """
+        Record and report the result of parseText() for a file.
+        :param parsed: tuple. Result of parseText(), None if the file could
+        not be read.
+        :return: dict. Tables by name parsed from the file.
+        """
+        if parsed is None:
+            if failed is not None:
+                failed.add(filename)
+            return {}
+        loaded, backend, seconds, missing, error = parsed
+        self.recordParse(path, backend, seconds)
+        if (error or missing) and failed is not None:
+            failed.add(filename)
+        if error and self._logging:
+            fhandler_logger.error(f"Error parsing file {path}: {error}")
+        if missing and self._logging:
+            fhandler_logger.error(f"{missing} tables in {path} are"
+            + " missing table-name.")
+        return loaded
+
+    def readText(self, path:str) -> str:
+        """
+        Read the text of a file.
+        :return: str. Text of the file, None if it could not be read.
+        """
+        try:
+            with open(path, 'r') as file:
+                return file.read()
+        except OSError as e:
+            if self._logging:
+                main_logger.error(f"{path} could not be loaded: {e}")
+            return None
+
+    @staticmethod
+    def mergeTables(loaded:list) -> tuple:
+        """
+        Merge the tables loaded from several files into a single dictionary.
+        When a name is loaded more than once the first table is kept.
+        :param loaded: list. Dictionaries of tables by name, in load order.
+        :return: tuple. (merged dictionary, list of every duplicate name in
+        load order)
+        """
+        tables = {}
+        duplicates = []
+        for new_tables in loaded:
+            for name, table in new_tables.items():
+                if name not in tables:
+                    tables[name] = table
                 else:
-                    continue
+                    duplicates.append(name)
+        return tables, duplicates
 
-        return all_dicts
+    def loadTables(self, filename:str, dir:str="",
+        use_cache:bool=True) -> dict:
+        """
+        Load a file and build its Table objects, using a compiled cache kept
+        in CACHE_DIR next to the file when it is still valid. A cache is
+        valid when the modification time, size and SHA-256 of the file match
+        the ones it was built from.
+        :param filename: str. Name of the file to read.
+        :opt param dir: str. Default is FileHandler._working_dir. Directory to
+        check for the file.
+        :param use_cache: bool. Read and write the cache.
+        :return: dict. Mapping of table names to Table objects, empty if the
+        file could not be loaded.
+        """
+        d = self._working_dir if not dir else dir
+        path = os.path.join(d, filename)
+        if (not self.verifyFileExists(filename, d) or
+        not self.verifyFileExtention(filename)):
+            if self._logging:
+                main_logger.error(f"{filename} could not be loaded.")
+            return {}
+
+        key = self.cacheKey(path) if use_cache else None
+        if not key:
+            return dict(self.iterTables(filename, d))
+        cache_path = self.cachePath(path)
+
+        tables = self.readCache(cache_path, key)
+        if tables is not None:
+            if self._logging:
+                fhandler_logger.debug(f"Loaded {filename} from cache.")
+            return tables
+
+        # Files with errors are not cached, so the errors show on every load
+        errors = []
+        tables = dict(self.iterTables(filename, d, errors))
+        if tables and not errors:
+            self.writeCache(cache_path, key, tables)
+        return tables
+
+    def loadTablesFromDir(self, dir:str="", use_cache:bool=True,
+        workers:int=1, files:list=None) -> list:
+        """
+        Load the tables of every file within a directory like loadTables().
+        Files without a valid cache are parsed with parseFiles() when there
+        is more than one worker, and streamed with iterTables() otherwise.
+        :param dir: str. Path to the directory to load files from.
+        :param workers: int. Amount of threads and processes to parse with.
+        :param files: list. Names of the files to load, listFiles() if None.
+        :return: list. Mapping of table names to Table objects for each file,
+        in the same order as files.
+        """
+        d = self._working_dir if not dir else dir
+        files = self.listFiles(d) if files is None else files
+        all_tables = [None] * len(files)
+        missed = []
+        for i, filename in enumerate(files):
+            path = os.path.join(d, filename)
+            key = self.cacheKey(path) if use_cache else None
+            if key:
+                all_tables[i] = self.readCache(self.cachePath(path), key)
+            if all_tables[i] is None:
+                missed.append((i, filename, key))
+
+        # Files with errors are not cached, so the errors show on every load
+        failed = set()
+        if workers > 1 and len(missed) > 1:
+            parsed = self.parseFiles([m[1] for m in missed], d, workers,
+                failed)
+        else:
+            parsed = [None] * len(missed)
+        for (i, filename, key), loaded in zip(missed, parsed):
+            if loaded is None:
+                errors = []
+                all_tables[i] = dict(self.iterTables(filename, d, errors))
+                if errors:
+                    failed.add(filename)
+            else:
+                all_tables[i] = self.buildTables(loaded, filename)
+            if key and all_tables[i] and filename not in failed:
+                self.writeCache(self.cachePath(os.path.join(d, filename)),
+                    key, all_tables[i])
+        return all_tables
+
+    def iterTables(self, filename:str, dir:str="", errors:list=None):
+        """
+        Read a file and yield (table name, Table) as each table is parsed.
+        YAML documents are parsed one at a time from the open file, and each
+        is built into a Table before the next one is read, so only a single
+        raw document is held in memory.
+        :param filename: str. Name of the file to read.
+        :opt param dir: str. Default is FileHandler._working_dir. Directory to
+        check for the file.
+        :param errors: list. If given, a message is added for each problem
+        found, so callers can tell a partly loaded file from a clean one.
+        """
+        def error(msg:str) -> None:
+            if errors is not None:
+                errors.append(msg)
+            if self._logging:
+                fhandler_logger.error(msg)
+
+        d = self._working_dir if not dir else dir
+        path = os.path.join(d, filename)
+        if (not self.verifyFileExists(filename, d) or
+        not self.verifyFileExtention(filename)):
+            if self._logging:
+                main_logger.error(f"{filename} could not be loaded.")
+            return
+
+        name = os.path.basename(filename)
+        ext = filename.split('.')[-1]
+        backend = "json" if ext == 'json' else YAML_BACKEND
+        seconds = 0.0
+        try:
+            with open(path, 'r') as file:
+                start = time.perf_counter()
+                if ext == 'json':
+                    loaded = json.load(file, object_hook=(
+                        lambda pairs: tableObjectHook(pairs, name)))
+                    if not isinstance(loaded, dict):
+                        raise ValueError("Expected an object of tables by"
+                            + " name.")
+                    documents = iter(loaded.values())
+                else:
+                    documents = loadTableDocuments(file, name)
+                seconds += time.perf_counter() - start
+                while True:
+                    start = time.perf_counter()
+                    document = next(documents, StopIteration)
+                    seconds += time.perf_counter() - start
+                    if document is StopIteration:
+                        break
+                    if isinstance(document, Table):
+                        yield document.name, document
+                        continue
+                    if not isinstance(document, dict):
+                        continue
+                    if 'table-name' not in document:
+                        error(f"Table in {path} is missing table-name.")
+                        continue
+                    yield document['table-name'], Table.create(document, name)
+        except (yaml.YAMLError, ValueError) as e:
+            error(f"Error parsing file {path}: {e}")
+        finally:
+            self.recordParse(path, backend, seconds)
+
+    def openPacked(self, filename:str, dir:str="") -> packed_store.PackedStore:
+        """
+        Open a packed table file written by packed_store.pack(). The file is
+        memory mapped and its tables are viewed without being copied.
+        :param filename: str. Name of the packed file.
+        :opt param dir: str. Default is FileHandler._working_dir. Directory to
+        check for the file.
+        :return: PackedStore. Mapping of table names to PackedTable views,
+        None if the file could not be opened.
+        """
+        d = self._working_dir if not dir else dir
+        path = os.path.join(d, filename)
+        try:
+            return packed_store.PackedStore(path)
+        except (OSError, ValueError) as e:
+            if self._logging:
+                main_logger.error(f"{filename} could not be loaded: {e}")
+            return None
+
+    def openSqlite(self, filename:str, dir:str="") -> sqlite_store.SqliteLibrary:
+        """
+        Open an SQLite table library, creating it if it does not exist.
+        :param filename: str. Name of the database file.
+        :opt param dir: str. Default is FileHandler._working_dir. Directory to
+        check for the file.
+        :return: SqliteLibrary. Mapping of table names to Table objects, None
+        if the file is not a database.
+        """
+        d = self._working_dir if not dir else dir
+        path = os.path.join(d, filename)
+        try:
+            return sqlite_store.SqliteLibrary(path, logs=self._logging)
+        except sqlite3.DatabaseError as e:
+            if self._logging:
+                main_logger.error(f"{filename} could not be loaded: {e}")
+            return None
+
+    @staticmethod
+    def buildTables(loaded:dict, filename:str="") -> dict:
+        """
+        Build Table objects from the dictionary of a loaded file.
+        :return: dict. Mapping of table names to Table objects.
+        """
+        if not loaded:
+            return {}
+        filename = os.path.basename(filename)
+        return {name: Table.create(table, filename)
+            for name, table in loaded.items()}
+
+    @staticmethod
+    def cacheKey(path:str) -> tuple:
+        """
+        Key a cache of a table file must match to be used.
+        :return: tuple. (CACHE_VERSION, modification time, size, SHA-256),
+        None if the file can not be read.
+        """
+        try:
+            stat = os.stat(path)
+            with open(path, 'rb') as file:
+                digest = hashlib.sha256(file.read()).hexdigest()
+        except OSError:
+            return None
+        return (CACHE_VERSION, stat.st_mtime_ns, stat.st_size, digest)
+
+    @staticmethod
+    def cachePath(path:str) -> str:
+        """
+        Path of the compiled cache for a table file.
+        """
+        d, filename = os.path.split(path)
+        return os.path.join(d, CACHE_DIR, filename + ".json")
+
+    def readCache(self, cache_path:str, key:tuple) -> dict:
+        """
+        Read tables from a cache file. Caches sit in folders other users may
+        write to, so they hold plain JSON data and never objects. Tables are
+        rebuilt by Table.fromColumns(), which checks the cached ranges of
+        rolls without parsing results keys again and creates each Result the
+        first time it is used.
+        :return: dict. Mapping of table names to Table objects, None if the
+        cache is missing, stale or unreadable.
+        """
+        try:
+            with open(cache_path, 'r') as file:
+                cache = json.load(file)
+            if tuple(cache['key']) != key:
+                return None
+            return {name: None if table is None
+                else Table.fromColumns(table, cache['file'])
+                for name, table in cache['tables'].items()}
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            if self._logging:
+                fhandler_logger.warning(f"Ignoring cache {cache_path}: {e}")
+            return None
+
+    def writeCache(self, cache_path:str, key:tuple, tables:dict) -> None:
+        """
+        Write tables to a cache file. The file is replaced in one step so a
+        partly written cache is never read.
+        """
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        filename = next((t.filename for t in tables.values() if t), "")
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(temp_path, 'w') as file:
+                json.dump({'key': key, 'file': filename,
+                    'tables': {name: table.toColumns() if table else None
+                    for name, table in tables.items()}}, file,
+                    separators=(',', ':'))
+            os.replace(temp_path, cache_path)
+        except (OSError, TypeError, ValueError) as e:
+            if self._logging:
+                fhandler_logger.warning(f"Could not write cache {cache_path}:"
+                + f" {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    async def load_files_async(self, dir="",
+        concurrency:int=ASYNC_CONCURRENCY) -> list:
+        """
+        Load every file within a directory like loadFiles() without blocking
+        the event loop. Files are read and parsed with parseFile() in the
+        default executor, at most concurrency files at a time.
+        :param dir: str. Path to the directory to load files from.
+        :param concurrency: int. Most files loaded at the same time.
+        :return: list. List of dictionaries read in from files, in file name
+            order.
+        """
+        d = self._working_dir if not dir else dir
+        files = self.listFiles(d)
+        loop = asyncio.get_running_loop()
+        limit = asyncio.Semaphore(max(1, concurrency))
+
+        async def load(filename):
+            async with limit:
+                loaded = await loop.run_in_executor(None, self.parseFile,
+                    filename, d)
+            if self._logging:
+                fhandler_logger.debug(f"Loaded {filename}")
+            return loaded
+
+        return list(await asyncio.gather(*map(load, files)))
 
     def writeFile(self, output:dict, filename:str, dir:str="",
         format:str="yaml") -> None:
@@ -154,20 +750,24 @@ class FileHandler:
             return False
         return True
 
-    def readYamlToDict(self, path:str) -> list:
+    def readYamlToDict(self, path:str) -> dict:
         """
-        Read a YAML file from a given filepath and return its contents as a
-        dictionary.
+        Read a YAML file from a given filepath and return its table documents
+        as a dictionary by table name. Documents that are not tables are
+        skipped.
         :param path: str. Path to the YAML file.
-        :return: dict. Dictionary representing the contents of the YAML file.
+        :return: dict. Dictionary of the tables in the YAML file.
         """
         try:
             with open(path, 'r') as file:
-                loader = yaml.FullLoader
-                data = list(yaml.load_all(file, Loader=loader))
-                loaded_dict = {}
-                for each in data:
-                    loaded_dict[each['table-name']] = each
+                start = time.perf_counter()
+                loaded_dict, missing = tablesByName(yaml.load_all(file,
+                    Loader=YamlLoader))
+                self.recordParse(path, YAML_BACKEND,
+                    time.perf_counter() - start)
+                if missing and self._logging:
+                    fhandler_logger.error(f"{missing} tables in {path} are"
+                    + " missing table-name.")
                 return loaded_dict
         except yaml.YAMLError as e:
             if self._logging:
@@ -183,7 +783,10 @@ class FileHandler:
         """
         try:
             with open(path, 'r') as file:
-                return json.loads(file)
+                start = time.perf_counter()
+                loaded = json.load(file)
+                self.recordParse(path, "json", time.perf_counter() - start)
+                return loaded
         except json.JSONDecodeError:
             if self._logging:
                 fhandler_logger.error(f"Error deconding JSON from file {path}")
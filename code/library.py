@@ -0,0 +1,297 @@
+"""
+    TableLibrary class
+    - keep a manifest of the tables in a directory
+    - rescan only the YAML documents of a file that changed
+    - load a table only when it is used
+"""
+from logger import setup_logger
+from models import Table
+import file_handler as fh
+from collections.abc import Mapping
+from typing import NamedTuple
+import hashlib
+import json
+import os
+import yaml
+
+main_logger, models_logger, fhandler_logger = setup_logger()
+
+# Manifest file, kept in the cache directory next to the table files
+MANIFEST_FILE = "manifest.json"
+# Bumped whenever the manifest layout changes, older manifests are rebuilt
+MANIFEST_VERSION = 2
+
+class ManifestEntry(NamedTuple):
+    """
+    What the manifest knows about a table without loading it. offset and
+    length locate the YAML document of the table within its file, and
+    digest is the SHA-256 of that document. All three are None when the
+    whole file has to be loaded to get the table.
+    """
+    name: str
+    group: str
+    roll: str
+    count: int
+    file: str
+    offset: int
+    length: int
+    digest: str
+
+def scanFile(path:str, known:dict=None) -> list:
+    """
+    Parse a table file to list the tables in it. YAML documents are parsed
+    one at a time, and documents seen in the last scan are not parsed again.
+    :param known: dict. SHA-256 hex digest of a document to its (name,
+        group, roll, count), from the last scan of the file.
+    :return: list. ManifestEntry for each table, in file order.
+    """
+    filename = os.path.basename(path)
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    if filename.split('.')[-1] == 'json':
+        loaded = json.loads(data)
+        return [ManifestEntry(name, table.get('group', ""), table.get('roll'),
+            len(table.get('results') or ()), filename, None, None, None)
+            for name, table in loaded.items() if isinstance(table, dict)]
+
+    known = known or {}
+    entries = []
+    for start, document in fh.splitDocuments(data):
+        digest = hashlib.sha256(document).hexdigest()
+        if digest in known:
+            entries.append(ManifestEntry(*known[digest], filename, start,
+                len(document), digest))
+            continue
+        try:
+            table = yaml.load(document, Loader=fh.YamlLoader)
+        except yaml.YAMLError:
+            # Documents that do not parse on their own, ie. behind a
+            # directive, are found by loading the whole file
+            return scanWhole(data, filename)
+        if isinstance(table, dict) and 'table-name' in table:
+            entries.append(ManifestEntry(table['table-name'],
+                table.get('group', ""), table.get('roll'),
+                len(table.get('results') or ()), filename, start,
+                len(document), digest))
+    return entries
+
+def scanWhole(data:bytes, filename:str) -> list:
+    """
+    List the tables of a YAML file by loading all of its documents at once.
+    """
+    return [ManifestEntry(table['table-name'], table.get('group', ""),
+        table.get('roll'), len(table.get('results') or ()), filename, None,
+        None, None) for table in yaml.load_all(data, Loader=fh.YamlLoader)
+        if isinstance(table, dict) and 'table-name' in table]
+
+class TableLibrary(Mapping):
+    """
+    Read only mapping of table names to Table objects for every table file
+    in a directory. Names, groups, rolls and result counts come from a
+    manifest kept in the cache directory, and a Table is only parsed when it
+    is first looked up. The manifest entry of a file is rebuilt when the
+    modification time or size of the file changes, and only the YAML
+    documents that changed are parsed again; tables loaded from unchanged
+    documents are kept. When a name is used by more than one file the first
+    file in name order wins.
+    """
+    def __init__(self, handler:fh.FileHandler, dir:str="",
+        logs:bool=False) -> None:
+        """
+        Initialize the library and bring the manifest up to date.
+        :param handler: FileHandler. Used to list and load files.
+        :param dir: str. Directory of table files, the handler's directory if
+            empty.
+        """
+        self._handler = handler
+        self._dir = dir if dir else handler.dir
+        self._logging = logs
+        # File name to {'mtime', 'size', 'tables'} as saved in the manifest
+        self._files = {}
+        self._entries = {}
+        self._duplicates = []
+        self._loaded = {}
+        self._readManifest()
+        self.sync()
+
+    def __getitem__(self, name:str) -> Table:
+        if name in self._loaded:
+            return self._loaded[name]
+        entry = self._entries[name]
+        if self._stat(entry.file) != self._stamp(entry.file):
+            self.sync([entry.file])
+            entry = self._entries[name]
+
+        if entry.offset is None:
+            table = dict(self._handler.iterTables(entry.file, self._dir)
+                ).get(name)
+        else:
+            try:
+                with open(os.path.join(self._dir, entry.file), 'rb') as file:
+                    file.seek(entry.offset)
+                    data = file.read(entry.length)
+                document = next(fh.loadTableDocuments(data, entry.file), None)
+                table = (document if isinstance(document, Table)
+                    else Table.create(document, entry.file))
+            except (OSError, yaml.YAMLError) as e:
+                if self._logging:
+                    fhandler_logger.error(f"Error loading table {name}: {e}")
+                table = None
+        self._loaded[name] = table
+        if self._logging:
+            fhandler_logger.debug(f"Loaded table {name} from {entry.file}")
+        return table
+
+    def __contains__(self, name) -> bool:
+        return name in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # Compared by identity, comparing contents would load every table
+    def __eq__(self, other) -> bool:
+        return self is other
+
+    __hash__ = object.__hash__
+
+    def sync(self, files:list=None) -> list:
+        """
+        Rebuild the manifest entries of the files that changed. Tables loaded
+        from a changed document of a file are dropped and loaded again when
+        next used.
+        :param files: list. Names of the files to check, every file in the
+            directory and in the manifest if None.
+        :return: list. Names of the files that changed, in sorted order.
+        """
+        if files is None:
+            files = set(self._handler.listFiles(self._dir)) | set(self._files)
+        changed = []
+        for filename in sorted(files):
+            stat = self._stat(filename)
+            if stat == self._stamp(filename):
+                continue
+            changed.append(filename)
+            if stat is None:
+                self._files.pop(filename, None)
+                continue
+            known = {row[6]: row[:4] for row in self._files.get(filename,
+                {}).get('tables', ()) if row[6]}
+            try:
+                entries = scanFile(os.path.join(self._dir, filename), known)
+            except (OSError, ValueError, yaml.YAMLError) as e:
+                if self._logging:
+                    fhandler_logger.error(f"Error scanning file {filename}:"
+                    + f" {e}")
+                entries = []
+            self._files[filename] = {'mtime': stat[0], 'size': stat[1],
+                'tables': [list(entry[:4]) + list(entry[5:])
+                    for entry in entries]}
+
+        if changed:
+            self._index(changed)
+            self._writeManifest()
+        return changed
+
+    def entry(self, name:str) -> ManifestEntry:
+        """
+        Manifest entry of a table, None if the name is not in the library.
+        """
+        return self._entries.get(name)
+
+    def isLoaded(self, name:str) -> bool:
+        """
+        True if the table has already been parsed.
+        """
+        return name in self._loaded
+
+    def _index(self, changed:list=()) -> None:
+        """
+        Rebuild the name index from the manifest, dropping the loaded tables
+        of changed files.
+        """
+        entries = {}
+        duplicates = []
+        for filename in sorted(self._files):
+            for name, group, roll, count, offset, length, digest in (
+                self._files[filename]['tables']):
+                if name in entries:
+                    duplicates.append(name)
+                    continue
+                entries[name] = ManifestEntry(name, group, roll, count,
+                    filename, offset, length, digest)
+        self._loaded = {name: table for name, table in self._loaded.items()
+            if self._unchanged(self._entries.get(name), entries.get(name),
+            changed)}
+        self._entries = entries
+        self._duplicates = duplicates
+
+    @staticmethod
+    def _unchanged(old:ManifestEntry, new:ManifestEntry, changed:list) -> bool:
+        """
+        True if a table loaded for the old entry is still the table of the
+        new one. YAML tables are compared by document, moving within the
+        file does not matter.
+        """
+        if not old or not new or old.file != new.file:
+            return False
+        if new.digest:
+            return old.digest == new.digest
+        return old == new and new.file not in changed
+
+    def _stat(self, filename:str) -> tuple:
+        return fh.fileStamp(os.path.join(self._dir, filename))
+
+    def _stamp(self, filename:str) -> tuple:
+        """
+        Modification time and size of a file when its entry was built.
+        """
+        known = self._files.get(filename)
+        return (known['mtime'], known['size']) if known else None
+
+    def _manifestPath(self) -> str:
+        return os.path.join(self._dir, fh.CACHE_DIR, MANIFEST_FILE)
+
+    def _readManifest(self) -> None:
+        try:
+            with open(self._manifestPath(), 'r') as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return
+        if manifest.get('version') == MANIFEST_VERSION:
+            self._files = manifest.get('files', {})
+            self._index()
+
+    def _writeManifest(self) -> None:
+        path = self._manifestPath()
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, 'w') as file:
+                json.dump({'version': MANIFEST_VERSION, 'files': self._files},
+                    file, separators=(',', ':'))
+            os.replace(temp_path, path)
+        except OSError as e:
+            if self._logging:
+                fhandler_logger.warning(f"Could not write manifest {path}: {e}")
+
+    @property
+    def dir(self) -> str:
+        return self._dir
+
+    @property
+    def duplicates(self) -> list:
+        """
+        Table names used by more than one file, in file name order.
+        """
+        return self._duplicates
+
+    @property
+    def entries(self) -> dict:
+        """
+        Mapping of table names to ManifestEntry objects.
+        """
+        return self._entries
@@ -2,11 +2,36 @@
     Object models to be used with Rabke Roller App.
     Hopefully Written in a way that can be expanded later.
 """
+import re
+import json
+import asyncio
+import random
 import dice_utils
 import logger
+from bisect import bisect_right
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
 
 main_logger, models_logger, fhandler_logger = logger.setup_logger()
 
+# Text between a pair of brackets, a possible inline link
+re_link = re.compile(r"\[([^\[\]]*)\]")
+# Result key covering a range of rolls, ie. '1-20'
+re_range = re.compile(r"^\s*(\d+)\s*-\s*(\d+)\s*$")
+
+# Largest dice pool (count * sides) a Table builds an alias sampler for
+MAX_ALIAS_SUPPORT = 100000
+# Default Resolver budgets: nesting depth, nested results and output bytes
+MAX_DEPTH = 20
+MAX_EXPANSIONS = 10000
+MAX_OUTPUT = 1000000
+# Events resolved or results rolled by the async Resolver methods between
+# yields to the event loop
+ASYNC_YIELD_EVERY = 1000
+# Results rolled by a ParallelResolver worker per task
+PARALLEL_CHUNK_SIZE = 1000
+
 class Link:
     """
     Link object contains all information of a single stand alone roll or roll
@@ -22,7 +47,7 @@ class Link:
         :return: Obj. If Link is valid, return the link obj. If link is not
         valid, return None.
         """
-        if not Link._valid(text):
+        if not Link._valid(text, logs=logs):
             return None
         
         link = Link()
@@ -31,6 +56,7 @@ class Link:
         link._type = 'table' if '@' in text else 'roll'
         link._roll = text if link._type == 'roll' else text.split('@')[0]
         link._table = '' if link._type == 'roll' else text.split('@')[1]
+        link._spec = dice_utils.compile_roll(link._roll)
         return link
 
     def __init__(self):
@@ -55,6 +81,24 @@ class Link:
     def table(self) -> str:
         return self._table
 
+    @property
+    def spec(self) -> dice_utils.RollSpec:
+        """
+        The compiled roll of the link. None if the roll is a fixed amount.
+        """
+        return self._spec
+
+    def rollAmount(self, rng:dice_utils.Rng=None) -> int:
+        """
+        Roll the link. For a 'roll' link this is the inline roll result, for a
+        'table' link this is the amount of times to roll on the table.
+        :param rng: Rng. Stream to roll with, the random module if None.
+        :return: int. The rolled value.
+        """
+        if self._spec:
+            return self._spec.roll(rng=rng)
+        return int(self._roll)
+
     def getDict(self) -> dict:
         """
         :return: dict. Returns all information within the object as a dict.
@@ -66,23 +110,24 @@ class Link:
             'table': self._table
         }
 
-    def _valid(text:str):
+    @staticmethod
+    def _valid(text:str, logs:bool=False):
         """
         Validate the string is formated correctly for Link use.
         """
         # Invaalid type
         if not isinstance(text, str):
-            if self._logging:
-                main_logger.error(f'Expected string, recieved {type(type)}')
+            if logs:
+                main_logger.error(f'Expected string, recieved {type(text)}')
             return False
         # invalid dice roll with no table
-        if not "@" in text and not dice_utils.is_valid(text):
-            if self._logging:
+        if not "@" in text and not dice_utils.compile_roll(text):
+            if logs:
                 main_logger.error(f'{text} is invalid link.')
             return False
-        if '@' in text and (not dice_utils.is_valid(text.split('@')[0]) and
+        if '@' in text and (not dice_utils.compile_roll(text.split('@')[0]) and
         not text.split('@')[0].isdigit()):
-            if self._logging:
+            if logs:
                 main_logger.error(f'1. Roll on table is not a valid roll'
                 + ' notation or digit.')
             return False
@@ -112,34 +157,45 @@ class Result:
         result = Result()
         result._logging = logs
         result._text = text
-        result._links = result.parseLinks(text)
+        result._segments = Result.compileSegments(text)
+        result._links = result.parseLinks(text, result._segments)
         return result
 
-    def parseLinks(self, text:str) -> dict:
+    @staticmethod
+    def compileSegments(text:str) -> list:
+        """
+        Split the raw string into an ordered list of segments. Each segment is
+        either a literal str or a Link. Brackets around a link stay in the
+        literal text, and bracketed text that is not a valid link is kept as
+        literal text. Every occurrence of a link gets its own segment.
+        :return: list. Segments of the raw string in order.
+        """
+        segments = []
+        literal = []
+        last = 0
+        for found in re_link.finditer(text):
+            link = Link.create(found.group(1))
+            if not link:
+                continue
+            literal.append(text[last:found.start(1)])
+            segments.append("".join(literal))
+            segments.append(link)
+            literal = []
+            last = found.end(1)
+        literal.append(text[last:])
+        segments.append("".join(literal))
+        return [seg for seg in segments if seg != ""]
+
+    def parseLinks(self, text:str, segments:list=None) -> dict:
         """
         Parse the raw sting for links and return a dictionary of them.
         dictionary key, value returns on {raw link: Link object}
+        :param segments: list. Already compiled segments of text, if any.
         :return: dict. a dictionary of links within the raw string.
         """
-
-        if not '[' in text or not ']' in text:
-            return None
-
-        links = {}
-        search = []
-        brackets = []
-        if '[' in text and ']' in text:
-            brackets = [i for i, ch in enumerate(text) 
-            if ch == '[' or ch == ']']
-        if brackets:
-            for i in range(0, len(brackets), 2):
-                try:
-                    search.append(text[brackets[i]+1:brackets[i+1]])
-                except:
-                    pass
-        for found in search:
-            links[found] = Link.create(found)
-        
+        if segments is None:
+            segments = Result.compileSegments(text)
+        links = {seg.text: seg for seg in segments if isinstance(seg, Link)}
         return links if links else None
 
     @property
@@ -159,6 +215,14 @@ class Result:
         """
         return self._links
 
+    @property
+    def segments(self) -> list:
+        """
+        Return the compiled segments of the raw string.
+        :return: list. Literal str and Link segments in order.
+        """
+        return self._segments
+
     @text.setter
     def text(self, text:str) -> None:
         """
@@ -167,12 +231,11 @@ class Result:
         :param str: The raw string for the int result of the table.
         """
         if not isinstance(text, str):
-            self._text = ""
-            return
+            text = ""
 
         self._text = text
-
-        self._links = self.parseLinks(self._text)
+        self._segments = Result.compileSegments(text)
+        self._links = self.parseLinks(text, self._segments)
 
     def toDict(self) -> dict:
         """
@@ -181,6 +244,52 @@ class Result:
         """
         return {"text": self._text, "links": self._links}
 
+class ResultMap(Mapping):
+    """
+    Read only {roll value: Result} view of a Table. Results are stored once
+    per range of rolls, lookups are a binary search over the ranges.
+    """
+    def __init__(self, table) -> None:
+        self._table = table
+
+    def __getitem__(self, value:int) -> Result:
+        i = self._table._find(value)
+        if i < 0:
+            raise KeyError(value)
+        return self._table._entries[i]
+
+    def __contains__(self, value) -> bool:
+        return self._table._find(value) >= 0
+
+    def __iter__(self):
+        for low, high in zip(self._table._lows, self._table._highs):
+            yield from range(low, high + 1)
+
+    def __len__(self) -> int:
+        return self._table._span
+
+class LazyResults(Sequence):
+    """
+    Results of a Table built from cached text, a Result is created from its
+    text the first time it is used.
+    """
+    def __init__(self, texts:list) -> None:
+        self._texts = texts
+        self._results = {}
+
+    def __getitem__(self, i:int) -> Result:
+        if i < 0:
+            i += len(self._texts)
+        if i in self._results:
+            return self._results[i]
+        text = self._texts[i]
+        result = None if text is None else Result.create(text)
+        self._results[i] = result
+        return result
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
 class Table:
     """
     Table instance to handle with all data partaining to tables. A loaded table
@@ -192,6 +301,7 @@ class Table:
             that belong to the table.
         The Table.create method should be used to validate and initialize.
         """
+        self._logging = False
 
     @staticmethod
     def create(loaded:dict, filename:str=""):
@@ -203,22 +313,83 @@ class Table:
             this is used for the table group name.
         """
 
-        table = Table()
+        if not isinstance(loaded, dict) or not Table().hasRequiredKeys(loaded):
+            return None
+        return Table.fromEntries(loaded['table-name'], loaded['roll'],
+            loaded['results'], loaded.get('group', ""), filename)
 
-        if not table.validateTable(loaded):
+    @staticmethod
+    def fromEntries(name:str, roll:str, results, group:str="",
+        filename:str=""):
+        """
+        Create and validate a table object from its fields, without the
+        dictionary of a whole table. Used by the loaders of FileHandler to
+        build tables while a file is parsed.
+        :param name: str. Name of the table.
+        :param roll: str. Roll notation or 'length'.
+        :param results: dict, or list of (key, result) pairs, of the results.
+        :param group: str. Group of the table.
+        :param filename: str. Name of the file the table was loaded from.
+        :return: Table, None if the table is not valid.
+        """
+        table = Table()
+        if (not isinstance(name, str) or not isinstance(roll, str)
+        or not isinstance(results, (dict, list))):
+            return None
+        keyed = table.parseResults(results)
+        if keyed is None or not table.validateRoll(roll):
             return None
 
         table._filename = filename
-        table._name = loaded['table-name']
-        table._roll = loaded['roll']
-        table._group = loaded['group'] if 'group' in loaded else ""
-        table._results = {}
+        table._name = name
+        table._roll = roll
+        table._group = group if group is not None else ""
 
-        for roll, res in loaded['results'].items():
-            table._results[roll] = Result.create(res)
+        table._lows, table._highs, table._entries = [], [], []
+        weights = []
+        for (low, high), _, res in keyed:
+            weight = None
+            if Table.isWeighted(res):
+                res, weight = res['text'], res['weight']
+            # Consecutive rolls with the same text share a single Result
+            if (table._entries and table._highs[-1] == low - 1
+            and weight is None and weights[-1] is None
+            and table._entries[-1] and table._entries[-1].text == res):
+                table._highs[-1] = high
+                continue
+            table._lows.append(low)
+            table._highs.append(high)
+            table._entries.append(Result.create(res))
+            weights.append(weight)
+        table._weights = (weights if any(w is not None for w in weights)
+            else None)
+        table._span = sum(h - l + 1 for l, h in zip(table._lows, table._highs))
+        table._results = ResultMap(table)
 
+        table._spec = dice_utils.compile_roll(table.roll)
+        table._buildSampler()
         return table
 
+    @staticmethod
+    def parseKey(key) -> tuple:
+        """
+        Parse a results key into the range of rolls it covers. A key is an
+        int, a str of an int, or a str range such as '1-20'.
+        :return: tuple. (low, high) inclusive, None if the key is invalid.
+        """
+        if isinstance(key, bool):
+            return None
+        if isinstance(key, int):
+            return (key, key)
+        if not isinstance(key, str):
+            return None
+        if key.strip().isdigit():
+            return (int(key), int(key))
+        found = re_range.match(key)
+        if not found or int(found.group(1)) > int(found.group(2)):
+            return None
+        return (int(found.group(1)), int(found.group(2)))
+
     @property
     def filename(self) -> str:
         """
@@ -245,6 +416,144 @@ class Table:
         """
         return f"1d{str(len(self.results))}" if self._roll == 'length' else self._roll
 
+    @property
+    def spec(self) -> dice_utils.RollSpec:
+        """
+        Return the compiled roll notation for the table.
+        :return: RollSpec of the table's roll.
+        """
+        return self._spec
+
+    def rollResult(self, rng:dice_utils.Rng=None) -> Result:
+        """
+        Roll on the table and return the Result rolled.
+        :param rng: Rng. Stream to roll with, the random module if None.
+        :return: The Result object for the rolled value, None if the rolled
+            value has no result.
+        """
+        return self.sample(rng)[1]
+
+    def sample(self, rng:dice_utils.Rng=None) -> tuple:
+        """
+        Roll on the table with a single random draw.
+        :param rng: Rng. Stream to roll with, the random module if None.
+        :return: tuple. (rolled value, Result object). The Result is None if
+            the rolled value has no result.
+        """
+        if self._alias_prob is None:
+            value = self._spec.roll(rng=rng)
+            return value, self.getResult(value)
+        return self._pick(rng.random() if rng else random.random())
+
+    def sampleMany(self, n:int, rng:dice_utils.Rng=None) -> list:
+        """
+        Roll on the table n times, drawing all random numbers at once.
+        :param rng: Rng. Stream to roll with, the random module if None.
+        :return: list. n tuples of (rolled value, Result object).
+        """
+        if n <= 0:
+            return []
+        if self._alias_prob is None:
+            values = dice_utils.sum_roll_many(self._spec, n, rng=rng)
+            return [(int(v), self.getResult(int(v))) for v in values]
+        draws = rng.randoms(n) if rng else [random.random() for _ in range(n)]
+        pick = self._pick
+        return [pick(u) for u in draws]
+
+    def _pick(self, u:float) -> tuple:
+        """
+        Map a uniform draw in [0, 1) to (rolled value, Result object). The
+        draw picks a column of the alias table, and what is left of it after
+        the column and alias choice picks the value within the outcome.
+        """
+        x = u * len(self._alias_prob)
+        j = int(x)
+        r = x - j
+        p = self._alias_prob[j]
+        if r < p:
+            k, f = j, r / p
+        else:
+            k, f = self._alias_idx[j], (r - p) / (1.0 - p)
+
+        low, high, i = self._outcomes[k]
+        if self._dist is None:
+            value = low + int(f * (high - low + 1))
+        else:
+            base = self._dist.countAtMost(low - 1)
+            count = self._dist.countAtMost(high) - base
+            value = self._dist.valueAtCount(base + int(f * count))
+        value = min(max(value, low), high)
+        return value, self._entries[i] if i >= 0 else None
+
+    def _buildSampler(self) -> None:
+        """
+        Build a Walker/Vose alias table over the outcomes of the table, so a
+        roll costs one random draw. An outcome is a range of results, or a
+        range of rolls with no result. Weights are the explicit 'weight' of
+        results if the table has any, otherwise the chance of the table's
+        roll landing in the range. Tables with very large rolls keep rolling
+        their notation instead.
+        """
+        self._alias_prob = self._alias_idx = self._outcomes = self._dist = None
+        spec = self._spec
+        if self._weights:
+            outcomes = [(l, h, i) for i, (l, h)
+                in enumerate(zip(self._lows, self._highs))]
+            weights = [h - l + 1 if w is None else w
+                for (l, h, _), w in zip(outcomes, self._weights)]
+        elif (spec.count == 1 and spec.keep_count >= 1
+            and spec.op in (None, '+', '-')):
+            shift = -spec.mod if spec.op == '-' else spec.mod
+            outcomes = self._outcomesBetween(1 + shift, spec.sides + shift)
+            weights = [h - l + 1 for l, h, _ in outcomes]
+        elif spec.count * spec.sides <= MAX_ALIAS_SUPPORT:
+            dist = dice_utils.distribution(spec)
+            outcomes, weights = [], []
+            for l, h, i in self._outcomesBetween(dist.min, dist.max):
+                w = dist.countAtMost(h) - dist.countAtMost(l - 1)
+                if w:
+                    outcomes.append((l, h, i))
+                    weights.append(w)
+            self._dist = dist
+        else:
+            return
+
+        n = len(weights)
+        total = sum(weights)
+        scaled = [w * n / total for w in weights]
+        prob, alias = [1.0] * n, list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s], alias[s] = scaled[s], l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+
+        self._alias_prob, self._alias_idx = prob, alias
+        self._outcomes = outcomes
+
+    def _outcomesBetween(self, low:int, high:int) -> list:
+        """
+        Split the rolls from low to high into ranges of results and the gaps
+        between them.
+        :return: list. [(low, high, index of the result or -1 for a gap)]
+        """
+        outcomes = []
+        at = low
+        for i, (l, h) in enumerate(zip(self._lows, self._highs)):
+            if h < at:
+                continue
+            if l > high:
+                break
+            if l > at:
+                outcomes.append((at, l - 1, -1))
+            outcomes.append((max(l, at), min(h, high), i))
+            at = min(h, high) + 1
+        if at <= high:
+            outcomes.append((at, high, -1))
+        return outcomes
+
     @property
     def group(self) -> str:
         """
@@ -254,21 +563,120 @@ class Table:
         return self._group
 
     @property
-    def results(self) -> dict:
+    def results(self) -> ResultMap:
         """
-        Return the dictionary of results stored in the table.
-        :return: Dictionary containing the key:value
-            ({roll result string: raw result string})  
+        Return the results stored in the table.
+        :return: ResultMap, a read only mapping of
+            {roll value: Result object}. Every roll covered by a range key is
+            a key of the mapping.
         """
         return self._results
 
+    @property
+    def intervals(self) -> list:
+        """
+        Return the results of the table as stored, one entry per range.
+        :return: list. [(low roll, high roll, Result object)] sorted by roll.
+        """
+        return list(zip(self._lows, self._highs, self._entries))
+
     @property
     def length(self) -> int:
         """
-        Return the length of the results dictionary.
+        Return the amount of rolls covered by the results.
         :return: an integer representing the length of the results dictionary.
         """
-        return len(self.results)
+        return self._span
+
+    def toDict(self) -> dict:
+        """
+        Return the table in the format it is loaded from, so that
+        Table.create() builds an equal table from it.
+        :return: dict. {'table-name', 'roll', 'group', 'results'}
+        """
+        weights = self._weights or [None] * len(self._lows)
+        results = {}
+        for low, high, result, weight in zip(self._lows, self._highs,
+            self._entries, weights):
+            key = str(low) if low == high else f"{low}-{high}"
+            text = result.text if result else None
+            results[key] = (text if weight is None
+                else {'text': text, 'weight': weight})
+        return {'table-name': self._name, 'roll': self._roll,
+            'group': self._group, 'results': results}
+
+    def toColumns(self) -> dict:
+        """
+        Return the table as columns of its ranges of rolls, so that
+        Table.fromColumns() builds an equal table without parsing results
+        keys again.
+        :return: dict. {'table-name', 'roll', 'group', 'lows', 'highs',
+            'texts', 'weights'}
+        """
+        return {'table-name': self._name, 'roll': self._roll,
+            'group': self._group, 'lows': list(self._lows),
+            'highs': list(self._highs),
+            'texts': [result.text if result else None
+                for result in self._entries],
+            'weights': list(self._weights) if self._weights else None}
+
+    @staticmethod
+    def fromColumns(columns:dict, filename:str=""):
+        """
+        Create a table from the output of toColumns(), as kept in the table
+        cache of FileHandler. Results keys are not parsed again, only the
+        types and order of the ranges are checked, and each Result is
+        created the first time it is used. The sampler is built again, since
+        it depends on the roll distribution.
+        :param columns: dict. Output of toColumns().
+        :param filename: str. Name of the file the table was loaded from.
+        :return: Table, None if the columns are not those of a valid table.
+        """
+        name, roll = columns.get('table-name'), columns.get('roll')
+        lows, highs = columns.get('lows'), columns.get('highs')
+        texts, weights = columns.get('texts'), columns.get('weights')
+        group = columns.get('group')
+        table = Table()
+        if (not isinstance(name, str) or not isinstance(roll, str)
+        or not isinstance(group, str)
+        or not all(isinstance(c, list) for c in (lows, highs, texts))
+        or not len(lows) == len(highs) == len(texts)
+        or not {type(x) for x in lows + highs} <= {int}
+        or any(l > h for l, h in zip(lows, highs))
+        or any(h >= l for h, l in zip(highs, lows[1:]))
+        or any(t is not None and not isinstance(t, str) for t in texts)
+        or not table.validateRoll(roll)):
+            return None
+        if weights is not None:
+            if (not isinstance(weights, list) or len(weights) != len(lows)
+            or not all(w is None or table.validateWeighted({'text': t,
+                'weight': w}) for t, w in zip(texts, weights))):
+                return None
+
+        table._filename = filename
+        table._name = name
+        table._roll = roll
+        table._group = group
+        table._lows, table._highs = lows, highs
+        table._entries = LazyResults(texts)
+        table._weights = weights
+        table._span = sum(h - l + 1 for l, h in zip(lows, highs))
+        table._results = ResultMap(table)
+        table._spec = dice_utils.compile_roll(roll)
+        table._buildSampler()
+        return table
+
+    def _find(self, value:int) -> int:
+        """
+        Binary search for the range holding value.
+        :return: int. Index of the range, -1 if no range holds value.
+        """
+        if not isinstance(value, int) or isinstance(value, bool):
+            return -1
+        i = bisect_right(self._lows, value) - 1
+        if i < 0 or value > self._highs[i]:
+            return -1
+        return i
 
     def getRawResult(self, value:int) -> str:
         """
@@ -283,7 +691,8 @@ class Table:
                 main_logger.error(f"Result Error: '{value}' not found within "
                 + f"results for table {self.name}.")
             return None
-        return self.results[value].text
+        result = self._entries[self._find(value)]
+        return result.text if result else None
 
     def getResult(self, value:int) -> Result:
         """ 
@@ -292,9 +701,13 @@ class Table:
             dictionary.
         :return: The Result object in coresponding to the value given.
         """
-        if not self.resultExists(value):
+        i = self._find(value)
+        if i < 0:
+            if self._logging:
+                main_logger.error(f"Key {value} not found in table {self.name}"
+                + " results.")
             return None
-        return self.results[value]
+        return self._entries[i]
 
     def resultExists(self, value:int) -> bool:
         """
@@ -302,17 +715,39 @@ class Table:
         :param value: int. Value of a roll on a table to be check if exists.
         :return: bool.  
         """
-        if value not in self.results:
+        if self._find(value) < 0:
             if self._logging:
                 main_logger.error(f"Key {value} not found in table {self.name}"
                 + " results.")
             return False
         return True
 
-    def validateTable(self, loaded:dict) -> bool:
+    def validateWeighted(self, res:dict) -> bool:
         """
-        Given the loaded dictionary with the expected table format, check if it
-            is actually a valid table.
+        Check a weighted result, {'text': str, 'weight': number}. The weight
+        must be above 0.
+        """
+        weight = res.get('weight')
+        if (not isinstance(res.get('text'), str) or isinstance(weight, bool)
+        or not isinstance(weight, (int, float)) or weight <= 0):
+            if self._logging:
+                main_logger.error(f"Invalid result {res}. Expected 'text' and"
+                + " a 'weight' above 0.")
+            return False
+        return True
+
+    @staticmethod
+    def isWeighted(res) -> bool:
+        """
+        True if a result is given as a dict with a 'weight'. Other dicts are
+        not results and are loaded as None, as are other values that are not
+        text.
+        """
+        return isinstance(res, dict) and 'weight' in res
+
+    def hasRequiredKeys(self, loaded:dict) -> bool:
+        """
+        Check the loaded dictionary has every key a table requires.
         """
         required_keys = ['table-name', 'roll', 'results']
         
@@ -323,6 +758,15 @@ class Table:
                     main_logger.error(f"Table format missing required key "
                     + f"{key}.")
                 return False
+        return True
+
+    def validateTable(self, loaded:dict) -> bool:
+        """
+        Given the loaded dictionary with the expected table format, check if it
+            is actually a valid table.
+        """
+        if not self.hasRequiredKeys(loaded):
+            return False
 
         if not isinstance(loaded['table-name'], str):
             return False
@@ -330,73 +774,608 @@ class Table:
             return False
         if not isinstance(loaded['results'], dict):
             return False
-        
-        # Check that roll is a valid roll or set to 'length'        
-        if (not dice_utils.is_valid(loaded['roll']) and 
-        not loaded['roll'] == 'length'):
+
+        return (self.parseResults(loaded['results']) is not None
+            and self.validateRoll(loaded['roll']))
+
+    def parseResults(self, results) -> list:
+        """
+        Check that every results key is a roll or range of rolls, that no two
+        keys cover the same roll, and that weighted results are valid.
+        :param results: dict, or list of (key, result) pairs. When a key is
+            given more than once in a list the last result is kept, as when
+            the pairs are read into a dict.
+        :return: list. ((low, high), position, result) of each result in roll
+            order, None if the results are not valid.
+        """
+        if isinstance(results, dict):
+            results = results.items()
+        else:
+            # Keys that are not rolls, ie. YAML lists, may not be hashable, so
+            # they are turned down before looking for repeated keys
+            for key, _ in results:
+                if not isinstance(key, (int, str)):
+                    if self._logging:
+                        main_logger.error(f"Invalid results key {key}. "
+                        + "Expected a roll or a range of rolls such as '1-20'.")
+                    return None
+            if len({key for key, _ in results}) < len(results):
+                results = dict(results).items()
+        keyed = []
+        for i, (key, res) in enumerate(results):
+            if Table.isWeighted(res) and not self.validateWeighted(res):
+                return None
+            parsed = Table.parseKey(key)
+            if not parsed:
+                if self._logging:
+                    main_logger.error(f"Invalid results key {key}. Expected a"
+                    + " roll or a range of rolls such as '1-20'.")
+                return None
+            keyed.append((parsed, i, res))
+        keyed.sort(key=lambda k: k[:2])
+        for ((_, high), _, _), ((low, _), _, _) in zip(keyed, keyed[1:]):
+            if low <= high:
+                if self._logging:
+                    main_logger.error(f"Results key covering {low} overlaps "
+                    + "another key.")
+                return None
+        return keyed
+
+    def validateRoll(self, roll:str) -> bool:
+        """
+        Check that roll is a valid roll or set to 'length'.
+        """
+        if not dice_utils.compile_roll(roll) and not roll == 'length':
             if self._logging:
                 main_logger.error(f"Table key 'roll' must be a valid roll or"
-                + f"'length'. Instead recieved {loaded['roll']}")
+                + f"'length'. Instead recieved {roll}")
             return False 
-
         return True
 
+class TextEvent(NamedTuple):
+    """
+    Literal text of a result, yielded by Resolver.iter_resolve().
+    """
+    text: str
+    depth: int
+
+class RollEvent(NamedTuple):
+    """
+    A rolled link, yielded by Resolver.iter_resolve(). For a 'roll' link the
+    value is the inline roll, for a 'table' link the value is the amount of
+    times the linked table is rolled on.
+    """
+    link: Link
+    value: int
+    depth: int
+
+class EnterTableEvent(NamedTuple):
+    """
+    Start of a nested result rolled on a table, yielded by
+    Resolver.iter_resolve().
+    """
+    table: str
+    value: int
+    depth: int
+
+class ExitTableEvent(NamedTuple):
+    """
+    End of a nested result rolled on a table, yielded by
+    Resolver.iter_resolve().
+    """
+    table: str
+    depth: int
+
+class TruncatedEvent(NamedTuple):
+    """
+    A Resolver budget ran out, yielded by Resolver.iter_resolve().
+    """
+    budget: str
+    depth: int
+
+class TraceRecord(NamedTuple):
+    """
+    A roll made while resolving, passed to the trace hook of a Resolver.
+    table is the table the rolled result is on (None for the result passed
+    in), link is the link text for inline rolls and amounts rolled for
+    linked tables and None when the table itself was rolled on, and dice is
+    the breakdown returned by a verbose roll, None for fixed values.
+    """
+    table: str
+    value: int
+    link: str
+    dice: dict
+    depth: int
+
+def logTrace(record:TraceRecord) -> None:
+    """
+    Trace hook for a Resolver that writes every record to the models logger
+    at debug level.
+    """
+    if record.link is None:
+        models_logger.debug(f"{'  ' * record.depth}Rolled {record.value} on "
+        + f"{record.table}")
+    else:
+        models_logger.debug(f"{'  ' * record.depth}{record.value} -> "
+        + f"[{record.link}] {record.dice}")
+
+def eventText(event) -> str:
+    """
+    Render a resolution event as the text Resolver.get() returns for it.
+    """
+    if isinstance(event, TextEvent):
+        return event.text
+    if isinstance(event, RollEvent):
+        if event.link.link_type == 'table':
+            return f"{event.value} on {event.link.table}"
+        return str(event.value)
+    if isinstance(event, EnterTableEvent):
+        return "\n\t"
+    if isinstance(event, TruncatedEvent):
+        return f"\n\t[Truncated: {event.budget} budget exceeded]"
+    return ""
+
+def checkYieldEvery(yield_every:int) -> None:
+    """
+    Check the yield_every of an async Resolver call.
+    Raises ValueError if it is not an int of at least 1.
+    """
+    if (isinstance(yield_every, bool) or not isinstance(yield_every, int)
+    or yield_every < 1):
+        raise ValueError(f"yield_every must be an int of at least 1, got"
+            + f" {yield_every!r}.")
+
+class ResolvedNode:
+    """
+    One resolved result in a tree built by Resolver.resolve_tree() or
+    Resolver.roll_many(tree=True). The table and value are what was rolled to
+    reach this result (None for a root not rolled on a table), text is the
+    resolved line, rolls are the (link text, value) of every link in the
+    line and children are the nested results rolled for its table links.
+    """
+    __slots__ = ('table', 'value', 'depth', 'text', 'rolls', 'children',
+        'truncated')
+
+    def __init__(self, table:str=None, value:int=None, depth:int=0,
+        text:str="") -> None:
+        self.table = table
+        self.value = value
+        self.depth = depth
+        self.text = text
+        self.rolls = []
+        self.children = []
+        # Budget that ran out while resolving the tree, set on the root only
+        self.truncated = None
+
+    def walk(self):
+        """
+        Yield every node of the tree depth first, starting with this one.
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def render(self) -> str:
+        """
+        Join the tree into the same text Resolver.get() returns.
+        """
+        parts = [self.text]
+        parts.extend("\n\t" + node.text for node in self.walk()
+            if node is not self)
+        if self.truncated:
+            parts.append(f"\n\t[Truncated: {self.truncated} budget exceeded]")
+        return "".join(parts)
+
+    def toDict(self) -> dict:
+        """
+        Return the tree as nested dicts of plain values.
+        """
+        out = {
+            'table': self.table,
+            'value': self.value,
+            'text': self.text,
+            'rolls': [list(roll) for roll in self.rolls],
+            'children': [child.toDict() for child in self.children]
+        }
+        if self.truncated:
+            out['truncated'] = self.truncated
+        return out
+
+    def toJson(self) -> str:
+        """
+        Return the tree as compact JSON.
+        """
+        return json.dumps(self.toDict(), separators=(',', ':'))
+
+    def toTuple(self) -> tuple:
+        """
+        Return the tree as compact nested tuples of
+        (table, value, text, rolls, children), children in the same layout.
+        """
+        return (self.table, self.value, self.text, tuple(self.rolls),
+            tuple(child.toTuple() for child in self.children))
+
+    @staticmethod
+    def fromTuple(data:tuple, depth:int=0):
+        """
+        Rebuild a tree from the layout returned by toTuple().
+        :return: ResolvedNode.
+        """
+        table, value, text, rolls, children = data
+        node = ResolvedNode(table, value, depth, text)
+        node.rolls = [tuple(roll) for roll in rolls]
+        node.children = [ResolvedNode.fromTuple(child, depth + 1)
+            for child in children]
+        return node
+
 class Resolver:
     """
     Resolver takes the loaded dict of tables and is used to resolve rolled
     results, including nested refereces. Generally only one instance of a
     resolver should be needed for an app.
     """
-    def __init__(self, tables:dict={}, logs:bool=False):
+    def __init__(self, tables:dict={}, logs:bool=False,
+        rng:dice_utils.Rng=None, max_depth:int=MAX_DEPTH,
+        max_expansions:int=MAX_EXPANSIONS, max_output:int=MAX_OUTPUT,
+        trace=None):
         """
         Initializing the resolver with a mapping of table names to Table
         instances.
+        :param rng: Rng. Stream used for every roll made by the resolver. A
+            new unseeded stream is created if None.
+        :param max_depth: int. Deepest level of nested table rolls resolved.
+        :param max_expansions: int. Most nested results resolved for a single
+            call to get().
+        :param max_output: int. Most bytes of UTF-8 output for a single call
+            to get().
+        :param trace: callable. Called with a TraceRecord for every roll made,
+            ie. logTrace. Tracing is off if None.
         """
         self._tables = tables
         self._logging = logs
+        self._rng = rng if rng else dice_utils.Rng()
+        self._max_depth = max_depth
+        self._max_expansions = max_expansions
+        self._max_output = max_output
+        self._trace = trace
+        self._truncated = None
 
     def get(self, result:Result, depth:int=0) -> str:
         """
         Given a Result object, clean it, and return results including results
         rolled on another table.
+
+        The text is built from the events of iter_resolve(). If a budget
+        runs out the output is cut short, ends with a truncation note, and
+        Resolver.truncated names the budget.
         """
-        dep = depth
         if not result.links:
+            self._truncated = None
             return result.text
-        else:
-            temp_text = result.text
-            print(f"{temp_text}")
-            for l, link in result.links.items():
-                if link.link_type == "roll":
-                    r = dice_utils.sum_roll(link.roll)
-                    print(f"{r} -> {link.text}")
-                    temp_text = temp_text.replace(link.text, str(r), 1)                    
-                elif link.link_type == 'table':
-                    temp_result = []
-                    amount = 0
-                    
-                    amount = link.roll
-                    if dice_utils.is_valid(link.roll):
-                        amount = dice_utils.sum_roll(link.roll)
-
-                    temp_text = temp_text.replace(link.text,
-                    f"{amount} on {link.table}", 1)
-
-                    for _ in range(int(amount)):
-                        table_roll = dice_utils.sum_roll(
-                            self._tables[link.table].roll)
-                        temp_res = self._tables[link.table].getResult(
-                            table_roll)
-                        temp_result.append(temp_res)
-                    
-                    spacer = "  "
-                    for inline in temp_result:
-                        inline_result = self._tables[link.table].getResult(
-                        dice_utils.sum_roll(self._tables[link.table].roll))
-                        temp_text += "\n\t"
-                        temp_text += self.get(inline_result, depth=dep+1)
-            
-            return temp_text                        
+        return "".join(map(eventText, self.iter_resolve(result, depth)))
+
+    def iter_resolve(self, result:Result, depth:int=0):
+        """
+        Resolve a Result object step by step, yielding events as they happen.
+
+        Yields TextEvent for literal text, RollEvent for every inline roll or
+        amount rolled for a linked table, EnterTableEvent and ExitTableEvent
+        around each nested result, and a TruncatedEvent if a budget runs out.
+        Nested results are resolved depth first from a work stack instead of
+        by recursion. Every result rolled for a line is pushed before the
+        first of them is resolved, so the stack holds the siblings still to
+        be resolved at each level of the current branch.
+        :param result: Result object to resolve.
+        :param depth: int. Depth of result, when resolving a nested result.
+        """
+        # Kept per call, so interleaved calls do not see each other's budgets.
+        # Resolver.truncated is set once the call is done.
+        truncated = None
+        size = 0
+        expansions = 0
+        # Frames are (Result, depth, table name, rolled value) or, to close a
+        # nested result, (None, depth, table name, None).
+        stack = [(result, depth, None, None)]
+        while stack:
+            node, level, table_name, value = stack.pop()
+            if node is None:
+                yield ExitTableEvent(table_name, level)
+                continue
+
+            events = []
+            if level > depth:
+                events.append(EnterTableEvent(table_name, value, level))
+                if self._trace:
+                    self._trace(TraceRecord(table_name, value, None, None,
+                        level))
+            wanted = []
+            events.extend(self._lineEvents(node, level, wanted, table_name))
+
+            for event in events:
+                size += len(eventText(event).encode())
+                if size > self._max_output:
+                    truncated = truncated or 'output'
+                    self._truncated = truncated
+                    self._logBudget('output')
+                    yield TruncatedEvent('output', level)
+                    for frame in reversed(stack):
+                        if frame[0] is None:
+                            yield ExitTableEvent(frame[2], frame[1])
+                    return
+                yield event
+                if isinstance(event, EnterTableEvent):
+                    # Closed only once entered, so a cut on the enter event
+                    # leaves no exit without its enter
+                    stack.append((None, level, table_name, None))
+
+            at_limit = level - depth >= self._max_depth
+            room = 0 if at_limit else self._max_expansions - expansions
+            children = []
+            for table, amount in wanted:
+                take = min(amount, room - len(children))
+                if take < amount and not truncated:
+                    truncated = 'depth' if at_limit else 'expansions'
+                    self._logBudget(truncated)
+                children.extend((r, level + 1, table.name, v)
+                    for v, r in table.sampleMany(take, self._rng) if r)
+            expansions += len(children)
+            stack.extend(reversed(children))
+
+        self._truncated = truncated
+        if truncated:
+            yield TruncatedEvent(truncated, depth)
+
+    async def resolve_async(self, result:Result, depth:int=0,
+        yield_every:int=ASYNC_YIELD_EVERY) -> tuple:
+        """
+        Resolve a Result object like get() from a coroutine. Control is
+        handed back to the event loop every yield_every events, so large
+        results do not stall other tasks. Calls may run at the same time on
+        one Resolver, so the budget that ran out is returned with the text
+        rather than read from Resolver.truncated.
+        :param result: Result object to resolve.
+        :param depth: int. Depth of result, when resolving a nested result.
+        :param yield_every: int. Events resolved between yields, at least 1.
+        :return: tuple. (fully resolved result, name of the budget that ran
+            out or None)
+        Raises ValueError if yield_every is less than 1.
+        """
+        checkYieldEvery(yield_every)
+        parts = []
+        truncated = None
+        for i, event in enumerate(self.iter_resolve(result, depth), 1):
+            parts.append(eventText(event))
+            if isinstance(event, TruncatedEvent) and not truncated:
+                truncated = event.budget
+            if i % yield_every == 0:
+                await asyncio.sleep(0)
+        return "".join(parts), truncated
+
+    async def roll_many_async(self, table_name:str, n:int,
+        yield_every:int=ASYNC_YIELD_EVERY, tree:bool=False) -> tuple:
+        """
+        Roll on a table n times like roll_many() from a coroutine. Results
+        are rolled yield_every at a time, handing control back to the event
+        loop between each batch.
+        :return: tuple. (n resolved strings or trees, name of the first
+            budget that ran out or None), None if the table is not loaded.
+        Raises ValueError if yield_every is less than 1.
+        """
+        checkYieldEvery(yield_every)
+        if table_name not in self._tables:
+            return self.roll_many(table_name, n, tree)
+
+        out = []
+        truncated = None
+        for start in range(0, n, yield_every):
+            # Each batch runs without yielding, so self._truncated is still
+            # the batch's own when it is read
+            out.extend(self.roll_many(table_name,
+                min(yield_every, n - start), tree))
+            truncated = truncated or self._truncated
+            await asyncio.sleep(0)
+        return out, truncated
+
+    def _lineEvents(self, result:Result, level:int, wanted:list,
+        table_name:str=None) -> list:
+        """
+        Resolve the inline rolls of a single result and roll the amount of
+        times to roll on each linked table.
+        :param wanted: list. (linked Table, amount) is appended for every
+            linked table that is loaded, in order.
+        :param table_name: str. Table the result is on, for the trace hook.
+        :return: list. TextEvent and RollEvent objects for the result's text.
+        """
+        if not result.links:
+            return [TextEvent(result.text, level)]
+
+        events = []
+        for seg in result.segments:
+            if not isinstance(seg, Link):
+                events.append(TextEvent(seg, level))
+                continue
+            if self._trace:
+                amount = self._traceLink(seg, table_name, level)
+            else:
+                amount = seg.rollAmount(self._rng)
+            events.append(RollEvent(seg, amount, level))
+            if seg.link_type == 'table':
+                table = self._tables.get(seg.table)
+                if not table:
+                    if self._logging:
+                        main_logger.error(f"Linked table {seg.table} is not "
+                        + "loaded.")
+                    continue
+                wanted.append((table, amount))
+        return events
+
+    def _traceLink(self, link:Link, table_name:str, level:int) -> int:
+        """
+        Roll a link verbosely and pass the roll to the trace hook.
+        :return: int. The rolled value.
+        """
+        dice = link.spec.roll(True, self._rng) if link.spec else None
+        value = dice['result'] if dice else link.rollAmount(self._rng)
+        self._trace(TraceRecord(table_name, value, link.text, dice, level))
+        return value
+
+    def _resolveLine(self, result:Result, table_name:str=None,
+        level:int=0) -> tuple:
+        """
+        Resolve the inline rolls of a single result and roll the amount of
+        times to roll on each linked table.
+        :return: tuple. (resolved text, [(link text, value)],
+            [(linked Table, amount)] in order)
+        """
+        wanted = []
+        events = self._lineEvents(result, level, wanted, table_name)
+        rolls = [(e.link.text, e.value) for e in events
+            if isinstance(e, RollEvent)]
+        return "".join(map(eventText, events)), rolls, wanted
+
+    def resolve_tree(self, result:Result, depth:int=0) -> ResolvedNode:
+        """
+        Resolve a Result object into a tree of ResolvedNode objects instead
+        of a single string.
+        :param result: Result object to resolve.
+        :param depth: int. Depth of result, when resolving a nested result.
+        :return: ResolvedNode. Root node of the resolved tree.
+        """
+        root = ResolvedNode(depth=depth)
+        stack = [root]
+        parts = [[]]
+        for event in self.iter_resolve(result, depth):
+            if isinstance(event, TextEvent):
+                parts[-1].append(event.text)
+            elif isinstance(event, RollEvent):
+                parts[-1].append(eventText(event))
+                stack[-1].rolls.append((event.link.text, event.value))
+            elif isinstance(event, EnterTableEvent):
+                child = ResolvedNode(event.table, event.value, event.depth)
+                stack[-1].children.append(child)
+                stack.append(child)
+                parts.append([])
+            elif isinstance(event, ExitTableEvent):
+                stack.pop().text = "".join(parts.pop())
+            else:
+                root.truncated = event.budget
+        root.text = "".join(parts[0])
+        return root
+
+    def roll_many(self, table_name:str, n:int, tree:bool=False) -> list:
+        """
+        Roll on a table n times and fully resolve every result.
+
+        Results are resolved one level of nesting at a time. At each level
+        every roll needed on a table is drawn in one batch, and only results
+        that were actually rolled are expanded further. Budgets apply to
+        each of the n results as they do for get().
+        :param table_name: str. Name of a loaded table.
+        :param n: int. Amount of results to roll.
+        :param tree: bool. Return ResolvedNode trees instead of strings.
+        :return: list. n resolved strings or trees, None if the table is not
+            loaded.
+        """
+        table = self._tables.get(table_name)
+        if not table:
+            if self._logging:
+                main_logger.error(f"Table {table_name} is not loaded.")
+            return None
+
+        self._truncated = None
+        expansions = [0] * n
+        roots = []
+        # Level entries are (ResolvedNode, Result, root index)
+        level = []
+        for i, (value, r) in enumerate(table.sampleMany(n, self._rng)):
+            roots.append(ResolvedNode(table_name, value))
+            if self._trace:
+                self._trace(TraceRecord(table_name, value, None, None, 0))
+            if r:
+                level.append((roots[-1], r, i))
+        depth = 0
+        while level:
+            # Rolls on a table are drawn together, each is written back to
+            # the slot of its link so children keep the order of the links
+            batches = {}
+            for node, result, root in level:
+                node.text, node.rolls, wanted = self._resolveLine(result,
+                    node.table, node.depth)
+                for linked, amount in wanted:
+                    room = (0 if depth >= self._max_depth
+                        else self._max_expansions - expansions[root])
+                    take = min(amount, room)
+                    if take < amount and not roots[root].truncated:
+                        roots[root].truncated = ('depth'
+                            if depth >= self._max_depth else 'expansions')
+                    expansions[root] += take
+                    batch = batches.setdefault(linked.name, (linked, []))
+                    for _ in range(take):
+                        batch[1].append((node, root, len(node.children)))
+                        node.children.append(None)
+
+            depth += 1
+            level = []
+            unfilled = []
+            for linked, slots in batches.values():
+                rolled = linked.sampleMany(len(slots), self._rng)
+                for (parent, root, slot), (value, r) in zip(slots, rolled):
+                    if r:
+                        child = ResolvedNode(linked.name, value, depth)
+                        if self._trace:
+                            self._trace(TraceRecord(linked.name, value, None,
+                                None, depth))
+                        parent.children[slot] = child
+                        level.append((child, r, root))
+                    else:
+                        unfilled.append(parent)
+            # Links that rolled a missing result add no child
+            for parent in unfilled:
+                parent.children = [c for c in parent.children if c]
+
+        if tree:
+            for root in roots:
+                if root.truncated:
+                    self._truncate(root.truncated)
+            return roots
+        return [self._render(root) for root in roots]
+
+    def _render(self, root:ResolvedNode) -> str:
+        """
+        Join a tree from roll_many() into the same text get() returns,
+        applying the output budget.
+        """
+        parts = []
+        size = 0
+        cut = root.truncated
+        for node in root.walk():
+            line = node.text if node is root else "\n\t" + node.text
+            size += len(line.encode())
+            if size > self._max_output:
+                cut = 'output'
+                break
+            parts.append(line)
+
+        if cut:
+            self._truncate(cut)
+            parts.append(f"\n\t[Truncated: {cut} budget exceeded]")
+        return "".join(parts)
+
+    def _truncate(self, budget:str) -> None:
+        """
+        Record the first budget that ran out during a call to roll_many().
+        """
+        if self._truncated:
+            return
+        self._truncated = budget
+        self._logBudget(budget)
+
+    def _logBudget(self, budget:str) -> None:
+        if self._logging:
+            models_logger.warning(f"Resolver {budget} budget exceeded, output"
+            + " truncated.")
 
     def update(self, tables:dict):
         """
@@ -409,4 +1388,157 @@ class Resolver:
         """
         Retrieve tables currently loaded within the Resolver object.
         """
-        return self._tables
\ No newline at end of file
+        return self._tables
+
+    @property
+    def rng(self) -> dice_utils.Rng:
+        """
+        Retrieve the random stream used by the Resolver object.
+        """
+        return self._rng
+
+    @property
+    def truncated(self) -> str:
+        """
+        Name of the budget that cut the last resolved output short: 'depth',
+        'expansions' or 'output'. None if the output is complete.
+        """
+        return self._truncated
+
+
+# Resolver settings of a ParallelResolver worker process, set by _initWorker()
+_worker_setup = None
+
+def _initWorker(tables:dict, budgets:tuple) -> None:
+    """
+    Receive the tables once when a ParallelResolver worker process starts.
+    """
+    global _worker_setup
+    _worker_setup = (tables, budgets)
+
+def _rollChunk(table_name:str, n:int, seed, key:tuple) -> tuple:
+    """
+    Roll one chunk of a ParallelResolver.roll_many() call in a worker.
+    :return: tuple. (list of n resolved strings, truncated budget or None)
+    """
+    tables, budgets = _worker_setup
+    resolver = Resolver(tables, rng=dice_utils.Rng(seed, key), max_depth=
+        budgets[0], max_expansions=budgets[1], max_output=budgets[2])
+    results = resolver.roll_many(table_name, n)
+    return results, resolver.truncated
+
+class ParallelResolver:
+    """
+    Resolves large amounts of rolls across a pool of worker processes. The
+    tables are sent to each worker once when it starts. Rolls are split into
+    chunks of a fixed size and every chunk gets its own random stream
+    derived from the seed, so the same seed gives the same results for any
+    amount of workers.
+    """
+    def __init__(self, tables:dict, workers:int=None, seed=None,
+        chunk_size:int=PARALLEL_CHUNK_SIZE, logs:bool=False,
+        max_depth:int=MAX_DEPTH, max_expansions:int=MAX_EXPANSIONS,
+        max_output:int=MAX_OUTPUT):
+        """
+        Initialize the resolver. Worker processes are started on first use.
+        :param tables: dict. Mapping of table names to Table instances.
+        :param workers: int. Amount of worker processes, defaults to the
+            amount of CPUs.
+        :param seed: int or str. Master seed, a random seed is picked if None.
+        :param chunk_size: int. Results rolled by a worker per task.
+        Budgets are applied to each result as they are by Resolver.
+        """
+        self._tables = tables
+        self._workers = workers
+        self._rng = dice_utils.Rng(seed)
+        self._chunk_size = max(1, chunk_size)
+        self._logging = logs
+        self._budgets = (max_depth, max_expansions, max_output)
+        self._executor = None
+        self._calls = 0
+        self._truncated = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self._workers,
+                initializer=_initWorker,
+                initargs=(self._tables, self._budgets))
+        return self._executor
+
+    def iter_roll_many(self, table_name:str, n:int):
+        """
+        Roll on a table n times across the worker pool, yielding resolved
+        strings in order as each chunk finishes.
+        :param table_name: str. Name of a loaded table.
+        :param n: int. Amount of results to roll.
+        """
+        self._truncated = None
+        if table_name not in self._tables:
+            if self._logging:
+                main_logger.error(f"Table {table_name} is not loaded.")
+            return
+
+        # Every call gets its own streams, keyed by call and chunk index
+        key = self._rng.key + (self._calls,)
+        self._calls += 1
+        sizes = [min(self._chunk_size, n - start)
+            for start in range(0, n, self._chunk_size)]
+        chunks = self._pool().map(_rollChunk, [table_name] * len(sizes),
+            sizes, [self._rng.seed] * len(sizes),
+            [key + (i,) for i in range(len(sizes))])
+        for results, truncated in chunks:
+            if truncated and not self._truncated:
+                self._truncated = truncated
+                if self._logging:
+                    models_logger.warning(f"Resolver {truncated} budget"
+                    + " exceeded, output truncated.")
+            yield from results
+
+    def roll_many(self, table_name:str, n:int) -> list:
+        """
+        Roll on a table n times across the worker pool.
+        :return: list. n resolved strings, None if the table is not loaded.
+        """
+        if table_name not in self._tables:
+            if self._logging:
+                main_logger.error(f"Table {table_name} is not loaded.")
+            return None
+        return list(self.iter_roll_many(table_name, n))
+
+    def update(self, tables:dict) -> None:
+        """
+        Update the table dictionary. Running workers are shut down and new
+        ones get the new tables.
+        """
+        if not tables == self._tables:
+            self.close()
+            self._tables = tables
+
+    def close(self) -> None:
+        """
+        Shut down the worker processes.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    @property
+    def seed(self):
+        """
+        Master seed the random stream of every chunk is derived from.
+        """
+        return self._rng.seed
+
+    @property
+    def truncated(self) -> str:
+        """
+        Name of the first budget that cut a result of the last call short,
+        None if every result is complete.
+        """
+        return self._truncated
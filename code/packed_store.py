@@ -0,0 +1,329 @@
+"""
+    Packed table store
+    - pack loaded tables into a single read only binary file
+    - open a packed file with mmap and view its tables without copying
+
+    Layout, every number little endian:
+    - header: magic, version, table count, bucket count, index offset, order
+      offset and string pool offset
+    - index: open addressing hash table of (CRC-32 of name, record offset)
+    - order: record offset of each table in packed order
+    - records: per table the string references of its name, roll, group and
+      file name, its interval count, span and flags, followed by the arrays
+      of low rolls, high rolls, result text offsets, result text lengths and,
+      for weighted tables, weights
+    - string pool: every distinct UTF-8 string once
+"""
+from logger import setup_logger
+from models import Table, Result, ResultMap
+import dice_utils
+from array import array
+from collections.abc import Mapping, Sequence
+import argparse
+import mmap
+import os
+import struct
+import sys
+import zlib
+
+main_logger, models_logger, fhandler_logger = setup_logger()
+
+MAGIC = b"TBLPACK\0"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQQQ")
+BUCKET = struct.Struct("<QQ")
+# name, roll, group and file name as (offset, length), intervals, span, flags
+RECORD = struct.Struct("<8QqqQ")
+# Text length of a result that has no Result object
+NO_TEXT = 2**64 - 1
+WEIGHTED = 1
+
+def nameHash(name:bytes) -> int:
+    return zlib.crc32(name)
+
+class _StringPool:
+    """
+    Collects distinct strings for pack(), each stored once.
+    """
+    def __init__(self) -> None:
+        self._offsets = {}
+        self._data = bytearray()
+
+    def add(self, text:str) -> tuple:
+        data = text.encode()
+        if data not in self._offsets:
+            self._offsets[data] = len(self._data)
+            self._data += data
+        return self._offsets[data], len(data)
+
+    @property
+    def data(self) -> bytes:
+        return bytes(self._data)
+
+def pack(tables:dict, path:str, logs:bool=False) -> int:
+    """
+    Write tables to a packed file.
+    :param tables: dict. Mapping of table names to Table objects, tables that
+        failed to load (None) are left out.
+    :param path: str. Path of the packed file to write.
+    :return: int. Amount of tables packed.
+    """
+    valid = [(name, table) for name, table in tables.items() if table]
+    if logs and len(valid) < len(tables):
+        fhandler_logger.warning(f"{len(tables) - len(valid)} tables not"
+        + " loaded properly were not packed.")
+
+    buckets = 1
+    while buckets < 2 * len(valid):
+        buckets *= 2
+    index_offset = HEADER.size
+    order_offset = index_offset + buckets * BUCKET.size
+    offset = order_offset + 8 * len(valid)
+
+    pool = _StringPool()
+    records = []
+    offsets = []
+    for name, table in valid:
+        n = len(table._lows)
+        texts = [pool.add(r.text) if r else (0, NO_TEXT)
+            for r in table._entries]
+        flags = WEIGHTED if table._weights else 0
+        record = [RECORD.pack(*pool.add(name), *pool.add(str(table._roll)),
+            *pool.add(table.group or ""), *pool.add(table.filename or ""),
+            n, table.length, flags)]
+        record.append(struct.pack(f"<{n}q", *table._lows))
+        record.append(struct.pack(f"<{n}q", *table._highs))
+        record.append(struct.pack(f"<{n}Q", *(t[0] for t in texts)))
+        record.append(struct.pack(f"<{n}Q", *(t[1] for t in texts)))
+        if flags & WEIGHTED:
+            record.append(struct.pack(f"<{n}d", *(float('nan') if w is None
+                else w for w in table._weights)))
+        record = b"".join(record)
+        offsets.append(offset)
+        records.append(record)
+        offset += len(record)
+
+    index = [(0, 0)] * buckets
+    for (name, _), record_offset in zip(valid, offsets):
+        key = nameHash(name.encode())
+        slot = key & (buckets - 1)
+        while index[slot][1]:
+            slot = (slot + 1) & (buckets - 1)
+        index[slot] = (key, record_offset)
+
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(valid), buckets,
+            index_offset, order_offset, offset))
+        file.write(b"".join(BUCKET.pack(*bucket) for bucket in index))
+        file.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+        file.write(b"".join(records))
+        file.write(pool.data)
+    return len(valid)
+
+class _PackedResults(Sequence):
+    """
+    Results of a PackedTable, a Result is created from the string pool the
+    first time it is used.
+    """
+    def __init__(self, store, text_offsets, text_lengths) -> None:
+        self._store = store
+        self._offsets = text_offsets
+        self._lengths = text_lengths
+        self._results = {}
+
+    def __getitem__(self, i:int) -> Result:
+        if i < 0:
+            i += len(self._offsets)
+        if i in self._results:
+            return self._results[i]
+        length = self._lengths[i]
+        result = (None if length == NO_TEXT
+            else Result.create(self._store.string(self._offsets[i], length)))
+        self._results[i] = result
+        return result
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+class PackedTable(Table):
+    """
+    Table viewing a record of a PackedStore. Rolls and result texts are read
+    from the mapped file, and Result objects are created when first used.
+    """
+    @staticmethod
+    def view(store, offset:int):
+        """
+        Create the view of the table record at an offset of the store.
+        :return: PackedTable.
+        """
+        fields = RECORD.unpack_from(store.buffer, offset)
+        n, span, flags = fields[8:]
+        table = PackedTable()
+        table._name = store.string(*fields[0:2])
+        table._roll = store.string(*fields[2:4])
+        table._group = store.string(*fields[4:6])
+        table._filename = store.string(*fields[6:8])
+
+        offset += RECORD.size
+        table._lows = store.array('q', offset, n)
+        table._highs = store.array('q', offset + 8 * n, n)
+        table._entries = _PackedResults(store,
+            store.array('Q', offset + 16 * n, n),
+            store.array('Q', offset + 24 * n, n))
+        table._weights = None
+        if flags & WEIGHTED:
+            table._weights = [None if w != w else w
+                for w in store.array('d', offset + 32 * n, n)]
+        table._span = span
+        table._results = ResultMap(table)
+        table._spec = dice_utils.compile_roll(table.roll)
+        table._buildSampler()
+        return table
+
+class PackedStore(Mapping):
+    """
+    Read only mapping of table names to PackedTable views of a packed file.
+    The file is mapped into memory, so opening is quick and the pages are
+    shared by every process that opens the same file.
+    """
+    def __init__(self, path:str) -> None:
+        """
+        Open a packed file.
+        :param path: str. Path of a file written by pack().
+        Raises ValueError if the file is not a packed table file.
+        """
+        self._path = path
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        self._order = None
+        try:
+            (magic, version, self._count, self._buckets, self._index_offset,
+                order_offset, self._pool_offset) = HEADER.unpack_from(
+                self._buffer)
+        except struct.error:
+            magic = None
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a packed table file.")
+        self._order = self.array('Q', order_offset, self._count)
+        self._tables = {}
+
+    def __getitem__(self, name:str) -> PackedTable:
+        if name in self._tables:
+            return self._tables[name]
+        offset = self._find(name)
+        if offset is None:
+            raise KeyError(name)
+        table = PackedTable.view(self, offset)
+        self._tables[name] = table
+        return table
+
+    def __contains__(self, name) -> bool:
+        return isinstance(name, str) and self._find(name) is not None
+
+    def __iter__(self):
+        for offset in self._order:
+            fields = RECORD.unpack_from(self._buffer, offset)
+            yield self.string(*fields[0:2])
+
+    def __len__(self) -> int:
+        return self._count
+
+    # Compared by identity, comparing contents would view every table
+    def __eq__(self, other) -> bool:
+        return self is other
+
+    __hash__ = object.__hash__
+
+    # Pickled by path, so worker processes map the same file
+    def __reduce__(self):
+        return (PackedStore, (self._path,))
+
+    def _find(self, name:str) -> int:
+        """
+        Look a name up in the hash index.
+        :return: int. Offset of the table record, None if not found.
+        """
+        data = name.encode()
+        key = nameHash(data)
+        mask = self._buckets - 1
+        slot = key & mask
+        while True:
+            stored, offset = BUCKET.unpack_from(self._buffer,
+                self._index_offset + slot * BUCKET.size)
+            if not offset:
+                return None
+            if stored == key:
+                start, length = RECORD.unpack_from(self._buffer, offset)[0:2]
+                start += self._pool_offset
+                if self._buffer[start:start + length] == data:
+                    return offset
+            slot = (slot + 1) & mask
+
+    def string(self, offset:int, length:int) -> str:
+        """
+        Decode a string of the string pool.
+        """
+        start = self._pool_offset + offset
+        return str(self._buffer[start:start + length], 'utf-8')
+
+    def array(self, typecode:str, offset:int, n:int):
+        """
+        View n numbers at an offset of the file. The view does not copy on
+        little endian machines.
+        """
+        view = self._buffer[offset:offset + 8 * n]
+        if sys.byteorder == 'little':
+            return view.cast(typecode)
+        # The file is little endian, read the bytes and swap each number
+        numbers = array(typecode)
+        numbers.frombytes(view)
+        numbers.byteswap()
+        return numbers
+
+    def close(self) -> None:
+        """
+        Unmap the file. Tables viewed from the store can not be used after.
+        """
+        self._tables = {}
+        if isinstance(self._order, memoryview):
+            self._order.release()
+        try:
+            self._buffer.release()
+            self._mmap.close()
+        except BufferError:
+            # Views of tables still in use keep the mapping open, it is
+            # unmapped once the last of them is gone
+            pass
+
+    @property
+    def buffer(self) -> memoryview:
+        return self._buffer
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+if __name__ == "__main__":
+    import file_handler as fh
+
+    parser = argparse.ArgumentParser(description="Pack YAML and JSON table"
+        + " files into a single packed table file.")
+    parser.add_argument("output", help="Path of the packed file to write.")
+    parser.add_argument("sources", nargs="+",
+        help="Table files, or folders of table files, to pack.")
+    args = parser.parse_args()
+
+    handler = fh.FileHandler(logs=False)
+    loaded = []
+    for source in args.sources:
+        if os.path.isdir(source):
+            loaded.extend(handler.loadTablesFromDir(source))
+        else:
+            loaded.append(handler.loadTables(source, use_cache=False))
+    tables, duplicates = fh.FileHandler.mergeTables(loaded)
+    for name in duplicates:
+        print(f"TABLE {name} already in loaded tables.")
+    print(f"Packed {pack(tables, args.output, logs=True)} tables into"
+        + f" {args.output}")
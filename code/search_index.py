@@ -0,0 +1,171 @@
+"""
+    SearchIndex class
+    - index the result text of loaded tables
+    - find results by words or by any part of their text
+"""
+from collections.abc import Mapping
+from typing import NamedTuple
+import re
+
+# Words of result text, the tokens of the word index
+re_token = re.compile(r"\w+")
+
+class SearchHit(NamedTuple):
+    """
+    A result whose text matched a search.
+    """
+    table: str
+    low: int
+    high: int
+    text: str
+
+def trigrams(text:str) -> set:
+    """
+    Every run of three characters in a lower case text.
+    """
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class SearchIndex:
+    """
+    In memory inverted index over the result text of tables. Words map to
+    the results they appear in, and so do trigrams, so a search for any
+    part of a text only checks the results that contain all of its
+    trigrams. Searches ignore case.
+    """
+    def __init__(self, tables:Mapping=None) -> None:
+        """
+        Initialize the index, indexing the given tables.
+        :param tables: Mapping. Table names to Table objects.
+        """
+        # Token or trigram to a set of (table name, result index) postings
+        self._tokens = {}
+        self._trigrams = {}
+        # Table name to [(low, high, text, lower case text)] of its results
+        self._texts = {}
+        if tables:
+            self.update(tables)
+
+    def addTable(self, name:str, table) -> None:
+        """
+        Index the results of a table, replacing any already indexed for the
+        name. Tables that failed to load (None) are not indexed.
+        """
+        self.removeTable(name)
+        if not table:
+            return
+        texts = []
+        for low, high, result in table.intervals:
+            if not result:
+                continue
+            lower = result.text.lower()
+            texts.append((low, high, result.text, lower))
+            posting = (name, len(texts) - 1)
+            for token in re_token.findall(lower):
+                self._tokens.setdefault(token, set()).add(posting)
+            for gram in trigrams(lower):
+                self._trigrams.setdefault(gram, set()).add(posting)
+        self._texts[name] = texts
+
+    def removeTable(self, name:str) -> None:
+        """
+        Drop the results of a table from the index.
+        """
+        texts = self._texts.pop(name, None)
+        if not texts:
+            return
+        for i, (_, _, _, lower) in enumerate(texts):
+            posting = (name, i)
+            for token in re_token.findall(lower):
+                self._discard(self._tokens, token, posting)
+            for gram in trigrams(lower):
+                self._discard(self._trigrams, gram, posting)
+
+    @staticmethod
+    def _discard(index:dict, key:str, posting:tuple) -> None:
+        postings = index.get(key)
+        if postings is not None:
+            postings.discard(posting)
+            if not postings:
+                del index[key]
+
+    def update(self, tables:Mapping, names:list=None) -> None:
+        """
+        Bring the index up to date with a mapping of tables. Indexed tables
+        that are no longer in the mapping are dropped.
+        :param tables: Mapping. Table names to Table objects.
+        :param names: list. Names of tables that changed and are indexed
+            again. If None, tables not yet indexed are added.
+        """
+        for name in [n for n in self._texts if n not in tables]:
+            self.removeTable(name)
+        if names is None:
+            names = [n for n in tables if n not in self._texts]
+        for name in names:
+            if name in tables:
+                self.addTable(name, tables[name])
+            else:
+                self.removeTable(name)
+
+    def search(self, query:str, limit:int=None, words:bool=False) -> list:
+        """
+        Find the results whose text contains the query, ignoring case.
+        :param query: str. Text to look for.
+        :param limit: int. Most hits returned, every hit if None.
+        :param words: bool. If True, find the results containing every word
+            of the query as a whole word, in any order.
+        :return: list. SearchHit for each matching result, by table then
+            roll.
+        """
+        lower = query.lower().strip()
+        if not lower:
+            return []
+
+        if words:
+            tokens = set(re_token.findall(lower))
+            candidates = self._intersect(self._tokens, tokens)
+            match = lambda text_lower: True
+        else:
+            if len(lower) >= 3:
+                candidates = self._intersect(self._trigrams, trigrams(lower))
+            else:
+                candidates = {(name, i) for name, texts in self._texts.items()
+                    for i in range(len(texts))}
+            # Trigrams only narrow the candidates, the text is checked
+            match = lambda text_lower: lower in text_lower
+
+        hits = []
+        for name, i in candidates:
+            low, high, text, text_lower = self._texts[name][i]
+            if match(text_lower):
+                hits.append(SearchHit(name, low, high, text))
+        order = {name: i for i, name in enumerate(self._texts)}
+        hits.sort(key=lambda hit: (order[hit.table], hit.low))
+        return hits if limit is None else hits[:limit]
+
+    @staticmethod
+    def _intersect(index:dict, keys) -> set:
+        """
+        Postings found under every key, starting from the rarest key.
+        """
+        postings = sorted((index.get(key, set()) for key in keys), key=len)
+        if not postings:
+            return set()
+        found = set(postings[0])
+        for other in postings[1:]:
+            found &= other
+            if not found:
+                break
+        return found
+
+    def tables(self, query:str, words:bool=False) -> list:
+        """
+        Names of the tables with a result matching the query, in index order.
+        """
+        return list(dict.fromkeys(hit.table
+            for hit in self.search(query, words=words)))
+
+    def __contains__(self, name:str) -> bool:
+        return name in self._texts
+
+    def __len__(self) -> int:
+        return len(self._texts)
@@ -0,0 +1,255 @@
+"""
+    SQLite table library
+    - import YAML and JSON tables into an SQLite database
+    - look tables up by name or group, and search result text
+    - load Table objects on demand through a small LRU cache
+"""
+from logger import setup_logger
+from models import Table
+from collections import OrderedDict
+from collections.abc import Mapping
+import argparse
+import os
+import sqlite3
+
+main_logger, models_logger, fhandler_logger = setup_logger()
+
+# Tables kept loaded by a SqliteLibrary
+SQLITE_CACHE_SIZE = 128
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tables (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    grp TEXT NOT NULL DEFAULT '',
+    roll TEXT NOT NULL,
+    filename TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS tables_grp ON tables (grp, name);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    table_id INTEGER NOT NULL REFERENCES tables (id) ON DELETE CASCADE,
+    low INTEGER NOT NULL,
+    high INTEGER NOT NULL,
+    text TEXT,
+    weight REAL
+);
+CREATE INDEX IF NOT EXISTS results_table ON results (table_id, low);
+"""
+
+# Full text index over result text, kept in sync by triggers
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS results_fts USING fts5 (
+    text, content='results', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS results_ai AFTER INSERT ON results BEGIN
+    INSERT INTO results_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS results_ad AFTER DELETE ON results BEGIN
+    INSERT INTO results_fts (results_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+END;
+"""
+
+class SqliteLibrary(Mapping):
+    """
+    Read only mapping of table names to Table objects stored in an SQLite
+    database. Tables are loaded from the database when looked up, and the
+    last SQLITE_CACHE_SIZE loaded tables are kept. Result text is indexed
+    with FTS5 when SQLite has it, otherwise search() scans the text.
+    """
+    def __init__(self, path:str, cache_size:int=SQLITE_CACHE_SIZE,
+        logs:bool=False) -> None:
+        """
+        Open or create a database.
+        :param path: str. Path of the database file.
+        :param cache_size: int. Most tables kept loaded.
+        """
+        self._path = path
+        self._cache_size = max(1, cache_size)
+        self._logging = logs
+        self._cache = OrderedDict()
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.executescript(SCHEMA)
+        try:
+            self._conn.executescript(FTS_SCHEMA)
+            self._fts = True
+        except sqlite3.OperationalError:
+            self._fts = False
+            if self._logging:
+                fhandler_logger.debug("SQLite has no FTS5, searching result"
+                + " text without an index.")
+
+    def __getitem__(self, name:str) -> Table:
+        if name in self._cache:
+            self._cache.move_to_end(name)
+            return self._cache[name]
+        table = self._load(name)
+        self._cache[name] = table
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return table
+
+    def __contains__(self, name) -> bool:
+        return self._conn.execute("SELECT 1 FROM tables WHERE name = ?",
+            (name,)).fetchone() is not None
+
+    def __iter__(self):
+        rows = self._conn.execute("SELECT name FROM tables ORDER BY id")
+        return (name for name, in rows.fetchall())
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM tables").fetchone()[0]
+
+    # Compared by identity, comparing contents would load every table
+    def __eq__(self, other) -> bool:
+        return self is other
+
+    __hash__ = object.__hash__
+
+    # Pickled by path, so worker processes open their own connection
+    def __reduce__(self):
+        return (SqliteLibrary, (self._path, self._cache_size))
+
+    def _load(self, name:str) -> Table:
+        """
+        Build a Table from its rows.
+        Raises KeyError if the name is not in the database.
+        """
+        row = self._conn.execute("SELECT id, grp, roll, filename FROM tables"
+            + " WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        table_id, group, roll, filename = row
+        results = {}
+        for low, high, text, weight in self._conn.execute("SELECT low, high,"
+            + " text, weight FROM results WHERE table_id = ? ORDER BY low",
+            (table_id,)):
+            key = low if low == high else f"{low}-{high}"
+            results[key] = (text if weight is None
+                else {'text': text, 'weight': weight})
+        if self._logging:
+            fhandler_logger.debug(f"Loaded table {name} from {self._path}")
+        return Table.create({'table-name': name, 'roll': roll, 'group': group,
+            'results': results}, filename)
+
+    def importTables(self, tables:dict) -> int:
+        """
+        Add tables to the database in a single transaction. A table with the
+        same name as one stored before the import replaces it. When a name
+        is given more than once the first table is kept, as with
+        FileHandler.mergeTables().
+        :param tables: dict or iterable of (name, Table). Tables that failed
+            to load (None) are left out.
+        :return: int. Amount of tables imported.
+        """
+        items = tables.items() if isinstance(tables, dict) else tables
+        imported = set()
+        with self._conn:
+            for name, table in items:
+                if not table:
+                    continue
+                if name in imported:
+                    if self._logging:
+                        fhandler_logger.warning(f"TABLE {name} already in"
+                        + " imported tables.")
+                    continue
+                self._conn.execute("DELETE FROM tables WHERE name = ?",
+                    (name,))
+                table_id = self._conn.execute("INSERT INTO tables (name, grp,"
+                    + " roll, filename) VALUES (?, ?, ?, ?)", (name,
+                    table.group or "", str(table._roll),
+                    table.filename or "")).lastrowid
+                weights = table._weights or [None] * len(table._lows)
+                self._conn.executemany("INSERT INTO results (table_id, low,"
+                    + " high, text, weight) VALUES (?, ?, ?, ?, ?)",
+                    [(table_id, low, high, result.text if result else None, w)
+                    for low, high, result, w in zip(table._lows, table._highs,
+                    table._entries, weights)])
+                self._cache.pop(name, None)
+                imported.add(name)
+        return len(imported)
+
+    def importFiles(self, handler, paths:list) -> int:
+        """
+        Stream the tables of table files and folders into the database in a
+        single transaction.
+        :param handler: FileHandler. Used to list and read files.
+        :param paths: list. Paths of table files or folders of table files.
+        :return: int. Amount of tables imported.
+        """
+        def stream():
+            for path in paths:
+                if os.path.isdir(path):
+                    for filename in handler.listFiles(path):
+                        yield from handler.iterTables(filename, path)
+                else:
+                    yield from handler.iterTables(path)
+        return self.importTables(stream())
+
+    def group(self, group:str) -> list:
+        """
+        Names of the tables in a group, in name order.
+        """
+        return [name for name, in self._conn.execute("SELECT name FROM tables"
+            + " WHERE grp = ? ORDER BY name", (group,))]
+
+    def search(self, query:str, limit:int=20) -> list:
+        """
+        Search the text of every result.
+        :param query: str. FTS5 query, or plain text to find when SQLite has
+            no FTS5.
+        :param limit: int. Most results returned.
+        :return: list. (table name, low roll, high roll, text) of matching
+            results, best matches first.
+        """
+        if self._fts:
+            sql = ("SELECT t.name, r.low, r.high, r.text FROM results_fts f"
+                + " JOIN results r ON r.id = f.rowid"
+                + " JOIN tables t ON t.id = r.table_id"
+                + " WHERE results_fts MATCH ? ORDER BY f.rank LIMIT ?")
+        else:
+            sql = ("SELECT t.name, r.low, r.high, r.text FROM results r"
+                + " JOIN tables t ON t.id = r.table_id"
+                + " WHERE r.text LIKE '%' || ? || '%' ORDER BY t.name, r.low"
+                + " LIMIT ?")
+        try:
+            return self._conn.execute(sql, (query, limit)).fetchall()
+        except sqlite3.OperationalError as e:
+            if self._logging:
+                fhandler_logger.error(f"Invalid search '{query}': {e}")
+            return []
+
+    def close(self) -> None:
+        """
+        Close the database connection.
+        """
+        self._cache.clear()
+        self._conn.close()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def fts(self) -> bool:
+        """
+        True if result text is indexed with FTS5.
+        """
+        return self._fts
+
+if __name__ == "__main__":
+    import file_handler as fh
+
+    parser = argparse.ArgumentParser(description="Import YAML and JSON table"
+        + " files into an SQLite table library.")
+    parser.add_argument("database", help="Path of the database to import to.")
+    parser.add_argument("sources", nargs="+",
+        help="Table files, or folders of table files, to import.")
+    args = parser.parse_args()
+
+    library = SqliteLibrary(args.database, logs=True)
+    count = library.importFiles(fh.FileHandler(logs=False), args.sources)
+    print(f"Imported {count} tables into {args.database}")
+    library.close()
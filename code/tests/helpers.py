@@ -0,0 +1,50 @@
+'''
+    Shared setup of the tests that work with table files and stores
+'''
+import os
+import tempfile
+import unittest
+
+from file_handler import FileHandler
+from models import Table
+import tests.test_dicts as test_tables
+
+def storeTables() -> dict:
+    """
+    Tables written to packed and SQLite stores: a plain table, a large
+    table, a weighted table linking to another one, and a table that
+    failed to load.
+    """
+    return {
+        'Test Table A': Table.create(test_tables.table_a),
+        'Test Table F': Table.create(test_tables.table_f),
+        'Weighted': Table.create({
+            'table-name': 'Weighted', 'roll': '1d2', 'group': 'Test',
+            'results': {1: {'text': "Heavy dragon [1@Test Table A]",
+                'weight': 9}, 2: "Light"}
+        }),
+        'Broken': None
+    }
+
+class TableDirTestCase(unittest.TestCase):
+    """
+    Test case with a temporary directory of table files and a FileHandler
+    for it. Subclasses write their files after calling setUp().
+    """
+    table = "table-name: {name}\nroll: 1d2\nresults:\n  1: {text}\n  2: Two\n"
+
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.dir = self.temp.name
+        self.handler = FileHandler(self.dir, logs=False)
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w') as file:
+            file.write(text)
+        # Make sure the change is seen on file systems with coarse times
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
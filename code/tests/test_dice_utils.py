@@ -182,6 +182,162 @@ class TestDieFuncs(unittest.TestCase):
         self.assertIsNone(test_a)
         self.assertIsNone(test_b)
 
+    def test_compileRoll(self):
+        """ Test Compiling Roll Notations """
+        # Plain roll
+        spec = dice_utils.compile_roll("3d6")
+        self.assertEqual((spec.count, spec.sides), (3, 6))
+        self.assertEqual((spec.keep, spec.keep_count), (None, 3))
+        self.assertEqual((spec.op, spec.mod), (None, 0))
+        # Keep and modifier
+        spec = dice_utils.compile_roll("4d6kl3+2")
+        self.assertEqual((spec.keep, spec.keep_count), ("kl", 3))
+        self.assertEqual((spec.op, spec.mod), ("+", 2))
+        # Compiled specs are cached
+        self.assertIs(spec, dice_utils.compile_roll("4d6kl3+2"))
+        # Invalid notations
+        self.assertIsNone(dice_utils.compile_roll("3f6"))
+        self.assertIsNone(dice_utils.compile_roll("1d0"))
+        self.assertIsNone(dice_utils.compile_roll("2d6/0"))
+        self.assertIsNone(dice_utils.compile_roll(12))
+
+    @patch('dice_utils.randint')
+    def test_sumRollSpec(self, mock_randint):
+        """ Test Summing a Compiled Roll """
+        spec = dice_utils.compile_roll("3d6kl2*2")
+        mock_randint.side_effect = [6, 1, 4]
+        self.assertEqual(dice_utils.sum_roll(spec), 10)
+        mock_randint.side_effect = [6, 1, 4]
+        self.assertEqual(spec.roll(verbose=True), {
+            'notation': '3d6kl2*2',
+            'rolls': [1, 4, 6],
+            'keep': [1, 4],
+            'result': 10,
+            'mod': '*2'
+        })
+
+    def test_sumRollMany(self):
+        """ Test Batch Rolling """
+        for note, low, high in [("4d6kh3", 3, 18), ("2d20kl1+2", 3, 22),
+            ("3d6*2", 6, 36)]:
+            results = dice_utils.sum_roll_many(note, 500)
+            self.assertEqual(len(results), 500)
+            self.assertTrue(all(low <= r <= high for r in results))
+        # Verbose returns the per die matrix
+        test = dice_utils.sum_roll_many("3d6kh2", 4, verbose=True)
+        self.assertEqual(len(test['rolls']), 4)
+        self.assertTrue(all(len(row) == 3 for row in test['rolls']))
+        self.assertTrue(all(len(row) == 2 for row in test['keep']))
+        # Invalid input
+        self.assertIsNone(dice_utils.sum_roll_many("3f6", 4))
+        self.assertIsNone(dice_utils.sum_roll_many("3d6", -1))
+
+    @patch('dice_utils.np', None)
+    @patch('dice_utils.randint')
+    def test_sumRollManyFallback(self, mock_randint):
+        """ Test Batch Rolling Without NumPy """
+        mock_randint.side_effect = [1, 4, 6, 2, 2, 5]
+        test = dice_utils.sum_roll_many("3d6kh2", 2, verbose=True)
+        self.assertEqual(test['rolls'], [[1, 4, 6], [2, 2, 5]])
+        self.assertEqual(test['keep'], [[4, 6], [2, 5]])
+        self.assertEqual(test['result'], [10, 7])
+
+    def test_distribution(self):
+        """ Test Exact Roll Distributions """
+        # 2d6 counts out of 36
+        dist = dice_utils.distribution("2d6")
+        self.assertEqual(dist.values, list(range(2, 13)))
+        self.assertEqual(dist.counts, [1, 2, 3, 4, 5, 6, 5, 4, 3, 2, 1])
+        self.assertAlmostEqual(dist.mean, 7)
+        self.assertAlmostEqual(dist.variance, 35 / 6)
+        self.assertAlmostEqual(dist.probAtLeast(11), 3 / 36)
+        self.assertAlmostEqual(dist.cdf(3), 3 / 36)
+        self.assertEqual(dist.pmf(13), 0.0)
+        # 4d6kh3 is a well known distribution
+        dist = dice_utils.distribution("4d6kh3")
+        self.assertEqual(dist.total, 1296)
+        self.assertEqual(dist.counts[dist.values.index(18)], 21)
+        self.assertEqual(dist.counts[dist.values.index(3)], 1)
+        self.assertAlmostEqual(dist.mean, 15869 / 1296)
+        # Keep lowest with a modifier, 2d20kl1+1
+        dist = dice_utils.distribution("2d20kl1+1")
+        self.assertEqual((dist.min, dist.max), (2, 21))
+        self.assertAlmostEqual(dist.pmf(2), 39 / 400)
+        # Distributions are cached per compiled notation
+        self.assertIs(dist, dice_utils.distribution("2d20kl1+1"))
+        self.assertIsNone(dice_utils.distribution("2f20"))
+
+    def test_sumRollPool(self):
+        """ Test Rolling Big Dice Pools """
+        rng = dice_utils.Rng(42)
+        # Plain sum stays within a few standard deviations of the mean
+        test = dice_utils.sum_roll("100000d6", rng=rng)
+        self.assertLess(abs(test - 350000), 6 * 540)
+        # Face counts cover every die
+        test = dice_utils.sum_roll("5000d20kh10+1", verbose=True, rng=rng)
+        self.assertEqual(sum(test['rolls'].values()), 5000)
+        self.assertEqual(sum(test['keep'].values()), 10)
+        self.assertEqual(test['result'],
+            sum(f * c for f, c in test['keep'].items()) + 1)
+        # More sides than dice streams the dice instead
+        test = dice_utils.sum_roll("2000d100000kl3", verbose=True, rng=rng)
+        self.assertEqual(sum(test['rolls'].values()), 2000)
+        self.assertEqual(sum(test['keep'].values()), 3)
+        self.assertLessEqual(dice_utils.sum_roll("2000d100000kl3", rng=rng),
+            test['result'] * 50)
+        # Batches of pools
+        test = dice_utils.sum_roll_many("3000d4kl5", 50, rng=rng)
+        self.assertTrue(all(r == 5 for r in test))
+
+    @patch('dice_utils.np', None)
+    @patch('dice_utils._np_rng', None)
+    def test_sumRollPoolFallback(self):
+        """ Test Rolling Big Dice Pools Without NumPy """
+        rng = dice_utils.Rng(7)
+        test = dice_utils.sum_roll("6000d6kh2000", verbose=True, rng=rng)
+        self.assertEqual(sum(test['rolls'].values()), 6000)
+        self.assertEqual(sum(test['keep'].values()), 2000)
+        # Binomial draws have the expected mean
+        draws = [dice_utils._binomial(10000, 0.25, rng.random)
+            for _ in range(2000)]
+        self.assertLess(abs(sum(draws) / 2000 - 2500), 5)
+
+class TestRng(unittest.TestCase):
+    def test_seeded(self):
+        """ Test seeded streams repeat """
+        rolls_a = [dice_utils.sum_roll("4d6kh3", rng=dice_utils.Rng(42))
+            for _ in range(3)]
+        rolls_b = [dice_utils.sum_roll("4d6kh3", rng=dice_utils.Rng(42))
+            for _ in range(3)]
+        self.assertEqual(rolls_a, rolls_b)
+        rng_a, rng_b = dice_utils.Rng("session"), dice_utils.Rng("session")
+        self.assertEqual(rng_a.randints(1, 20, 50), rng_b.randints(1, 20, 50))
+        self.assertEqual(rng_a.randoms(5), rng_b.randoms(5))
+        self.assertEqual(dice_utils.Rng(7).seed, 7)
+
+    def test_spawn(self):
+        """ Test spawning child streams """
+        parent = dice_utils.Rng(42)
+        child_a, child_b = parent.spawn(2)
+        child_c = parent.spawn()[0]
+        self.assertEqual(child_a.key, (0,))
+        self.assertEqual(child_c.key, (2,))
+        self.assertNotEqual(child_a.randints(1, 1000, 20),
+            child_b.randints(1, 1000, 20))
+        # Spawning from the same seed gives the same children
+        again = dice_utils.Rng(42).spawn(2)[1]
+        self.assertEqual(again.randints(1, 1000, 20),
+            dice_utils.Rng(42).spawn(2)[1].randints(1, 1000, 20))
+
+    def test_bounds(self):
+        """ Test streams stay within bounds """
+        rng = dice_utils.Rng()
+        rolls = rng.randints(1, 6, 1000)
+        self.assertEqual(set(rolls), {1, 2, 3, 4, 5, 6})
+        self.assertTrue(all(0 <= r < 1 for r in rng.randoms(100)))
+        die = dice_utils.Die.create(1, 20)
+        self.assertTrue(1 <= die.roll(rng) <= 20)
+
 class TestDieClass(unittest.TestCase):
     def test_init(self):
         test_a = dice_utils.Die()               # Should default 1, 6
@@ -82,4 +82,26 @@ table_e = {
         7: "Example 7: there is no link in this example",
         8: "Example 8: inline roll with invalid roll notation -> [1f4]"
     }
-}
\ No newline at end of file
+}
+# Table is valid and uses range keys
+table_f = {
+    'table-name': 'Test Table F',
+    'group': 'examples',
+    'roll': '1d100',
+    'results': {
+        '1-50': "Example 1: covers half the rolls",
+        '51-99': "Example 2: covers the rest but one",
+        100: "Example 3: a single roll"
+    }
+}
+
+# Table has overlapping range keys
+table_g = {
+    'table-name': 'Test Table G',
+    'group': 'examples',
+    'roll': '1d20',
+    'results': {
+        '1-10': "Example 1",
+        '10-20': "Example 2"
+    }
+}
@@ -1,20 +1,28 @@
 import sys, io, yaml, json
+import asyncio
+import os
+import tempfile
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, mock_open
 
+import file_handler
 from file_handler import FileHandler
 
 class TestFileHandler(unittest.TestCase):
-    mock_yaml_file = """
-    "Key A": "Value 1"
-    "Key B":
-        "Subkey C": "Subvalue 2"
-    """
-
     mock_json_file = """
     {"Key A": "Value 1", "Key B": {"Subkey C": "Subvalue 2"}}
     """
 
+    mock_tables_file = """
+table-name: Table A
+roll: 1d1
+---
+"Key A": "Value 1"
+---
+table-name: Table B
+roll: 1d2
+"""
+
     mock_text_file = """
     Key A: Value 1
     Key B:
@@ -28,29 +36,35 @@ class TestFileHandler(unittest.TestCase):
         }
     }
 
-    @patch('builtins.open', new_callable=MagicMock)
-    def test_readYamlToDict(self, mock_open):
+    def test_readYamlToDict(self):
         """ Test reading YAML file to Dict """
         # Setup
         handler = FileHandler()
-        mock_open.return_value.__enter__.return_value = self.mock_yaml_file
         # Actions
-        result = handler.readYamlToDict("dummy_file.yaml")
+        with patch('builtins.open', mock_open(read_data=self.mock_tables_file)
+            ) as mock_file:
+            result = handler.readYamlToDict("dummy_file.yaml")
         # Asserts
-        self.assertEqual(mock_open.call_count, 1)
-        self.assertEqual(result, self.expected_file_to_dict)
+        self.assertEqual(mock_file.call_count, 1)
+        # Documents without a table-name are skipped
+        self.assertEqual(result, {
+            "Table A": {"table-name": "Table A", "roll": "1d1"},
+            "Table B": {"table-name": "Table B", "roll": "1d2"}})
 
-    @patch('builtins.open', new_callable=MagicMock)
-    def test_readJsonToDict(self, mock_open):
+    def test_readJsonToDict(self):
         """ Test reading JSON file to dict """
         # Setup
-        handler = FileHandler()
-        mock_open.return_value.__enter__.return_value = self.mock_json_file
+        handler = FileHandler(logs=False)
         # Actions
-        result = handler.readJsonToDict("dummy_file.json")
+        with patch('builtins.open', mock_open(read_data=self.mock_json_file)
+            ) as mock_file:
+            result = handler.readJsonToDict("dummy_file.json")
+        with patch('builtins.open', mock_open(read_data="{")):
+            invalid = handler.readJsonToDict("dummy_file.json")
         # Asserts
-        self.assertEqual(mock_open.call_count, 1)
+        self.assertEqual(mock_file.call_count, 1)
         self.assertEqual(result, self.expected_file_to_dict)
+        self.assertEqual(invalid, {})
 
     @patch('file_handler.FileHandler.readYamlToDict', new_callable=MagicMock)
     @patch('file_handler.FileHandler.readJsonToDict', new_callable=MagicMock)
@@ -77,12 +91,14 @@ class TestFileHandler(unittest.TestCase):
         self.assertEqual(result_text, None)
         
     
-    @patch('file_handler.FileHandler.loadFile', new_callable=MagicMock)
+    @patch('os.path.isfile', new_callable=MagicMock)
+    @patch('file_handler.FileHandler.parseFile', new_callable=MagicMock)
     @patch('glob.glob', new_callable=MagicMock)
-    def test_loadFiles(self, mock_glob, mock_loadedFile):
+    def test_loadFiles(self, mock_glob, mock_loadedFile, mock_isfile):
         """ Test Loading multiple files """
         # Setup
         handler = FileHandler()
+        mock_isfile.return_value = True
         mock_glob.return_value = [
             "test_file_a.yaml", "test_file_b.json", "test_file_c.txt"
         ]
@@ -94,6 +110,201 @@ class TestFileHandler(unittest.TestCase):
             self.expected_file_to_dict,
             self.expected_file_to_dict])
     
+    @patch('os.path.isfile', new_callable=MagicMock)
+    @patch('file_handler.FileHandler.parseFile', new_callable=MagicMock)
+    @patch('glob.glob', new_callable=MagicMock)
+    def test_loadFilesAsync(self, mock_glob, mock_loadedFile, mock_isfile):
+        """ Test loading multiple files from a coroutine """
+        # Setup
+        handler = FileHandler(logs=False)
+        mock_glob.return_value = [
+            "dummy/test_file_b.json", "dummy/test_file_c.txt",
+            "dummy/test_file_a.yaml"
+        ]
+        mock_isfile.return_value = True
+        mock_loadedFile.side_effect = lambda f, d: {f: d}
+        # Results
+        result = asyncio.run(handler.load_files_async('dummy', concurrency=1))
+        # Asserts
+        self.assertEqual(result, [
+            {"test_file_a.yaml": "dummy"},
+            {"test_file_b.json": "dummy"}])
+
+    def test_loadTablesCache(self):
+        """ Test loading tables through the compiled cache """
+        # Setup
+        handler = FileHandler(logs=False)
+        table = "table-name: Test Table\nroll: 1d2\nresults:\n  1: A\n  2: B\n"
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "test_file.yaml")
+            with open(path, 'w') as file:
+                file.write(table)
+            # Results
+            cold = handler.loadTables("test_file.yaml", d)
+            with patch('file_handler.FileHandler.iterTables') as mock_iter:
+                warm = handler.loadTablesFromDir(d)
+                self.assertEqual(mock_iter.call_count, 0)
+            # Caches are plain JSON, anything else is ignored
+            with open(handler.cachePath(path), 'r') as file:
+                self.assertEqual(json.load(file)['tables']['Test Table'],
+                    cold['Test Table'].toColumns())
+            with open(handler.cachePath(path), 'wb') as file:
+                file.write(b"\x80\x04not json")
+            rebuilt = handler.loadTables("test_file.yaml", d)
+            with open(path, 'w') as file:
+                file.write(table.replace("B", "C"))
+            changed = handler.loadTables("test_file.yaml", d)
+            # Asserts
+            self.assertTrue(os.path.exists(handler.cachePath(path)))
+        self.assertEqual(cold['Test Table'].getRawResult(2), "B")
+        self.assertEqual(warm[0]['Test Table'].getRawResult(2), "B")
+        self.assertEqual(warm[0]['Test Table'].filename, "test_file.yaml")
+        self.assertEqual(rebuilt['Test Table'].getRawResult(2), "B")
+        self.assertEqual(changed['Test Table'].getRawResult(2), "C")
+
+    def test_parseStats(self):
+        """ Test recording the parser backend and time per file """
+        # Setup
+        handler = FileHandler(logs=False)
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "test_file.yaml")
+            with open(path, 'w') as file:
+                file.write("table-name: Test Table\nroll: 1d1\n")
+            # Results
+            result = handler.readYamlToDict(path)
+        # Asserts
+        self.assertEqual(result, {"Test Table": {
+            "table-name": "Test Table", "roll": "1d1"}})
+        backend, seconds = handler.parseStats[path]
+        self.assertEqual(backend, file_handler.YAML_BACKEND)
+        self.assertIn(backend, ("libyaml", "python"))
+        self.assertGreaterEqual(seconds, 0)
+
+    def test_loadFilesWorkers(self):
+        """ Test loading files with worker pools """
+        # Setup
+        handler = FileHandler(logs=False)
+        with tempfile.TemporaryDirectory() as d:
+            for name, text in [("b.yaml", "table-name: B\n---\ntable-name: A\n"),
+                ("a.json", '{"A": {"table-name": "A"}}'),
+                ("c.yml", "table-name: [\n"), ("d.txt", ""),
+                ("e.yaml", "not: a table\n---\n- list\n---\ntable-name: E\n"),
+                ("g.json", "[1, 2]"),
+                ("h.yaml", "table-name: H\n---\ntable-name: [\n")]:
+                with open(os.path.join(d, name), 'w') as file:
+                    file.write(text)
+            # Folders are not files, whatever their name
+            os.mkdir(os.path.join(d, "f.yaml"))
+            # Results
+            result = handler.loadFiles(d, workers=2)
+            stats = handler.parseStats
+            # One worker parses bad files the same way
+            sequential = handler.loadFiles(d, workers=1)
+            from_async = asyncio.run(handler.load_files_async(d))
+        # Asserts
+        self.assertEqual(result, [{"A": {"table-name": "A"}},
+            {"B": {"table-name": "B"}, "A": {"table-name": "A"}}, {},
+            {"E": {"table-name": "E"}}, {}, {"H": {"table-name": "H"}}])
+        self.assertEqual(sequential, result)
+        self.assertEqual(from_async, result)
+        self.assertEqual(len(stats), 6)
+        self.assertEqual(FileHandler.mergeTables(result),
+            ({"A": {"table-name": "A"}, "B": {"table-name": "B"},
+            "E": {"table-name": "E"}, "H": {"table-name": "H"}}, ["A"]))
+
+    def test_iterTables(self):
+        """ Test streaming tables from a file """
+        # Setup
+        handler = FileHandler(logs=False)
+        table = "table-name: {}\nroll: 1d1\nresults:\n  1: A\n"
+        with tempfile.TemporaryDirectory() as d:
+            with open(os.path.join(d, "test_file.yaml"), 'w') as file:
+                file.write(table.format("A") + "---\n" + table.format("B")
+                    + "---\ntable-name: [\n")
+            with open(os.path.join(d, "other.json"), 'w') as file:
+                file.write('["not", "tables"]')
+            # Results
+            errors = []
+            stream = handler.iterTables("test_file.yaml", d, errors)
+            first = next(stream)
+            rest = list(stream)
+            json_errors = []
+            json_tables = list(handler.iterTables("other.json", d,
+                json_errors))
+            # Files that fail partway are loaded but never cached
+            partial = handler.loadTables("test_file.yaml", d)
+            loaded = handler.loadTablesFromDir(d, workers=2)
+            cached = os.path.exists(handler.cachePath(
+                os.path.join(d, "test_file.yaml")))
+        # Asserts
+        self.assertEqual(first[0], "A")
+        self.assertEqual(first[1].getRawResult(1), "A")
+        self.assertEqual([name for name, _ in rest], ["B"])
+        self.assertEqual(len(errors), 1)
+        self.assertEqual((json_tables, len(json_errors)), ([], 1))
+        self.assertEqual(list(partial), ["A", "B"])
+        self.assertEqual([list(tables) for tables in loaded], [[], ["A", "B"]])
+        self.assertFalse(cached)
+
+    def test_shippedTables(self):
+        """ Test the bundled tables load, results that are not text as None """
+        # Setup
+        handler = FileHandler(logs=False)
+        tables_dir = os.path.join(os.path.dirname(__file__), "..", "..",
+            "tables")
+        # Results
+        errors = []
+        loaded = dict(handler.iterTables("magic-items.yaml", tables_dir,
+            errors))
+        # Asserts
+        self.assertEqual(errors, [])
+        self.assertTrue(all(loaded.values()))
+        self.assertIsNone(loaded["Magic Item Table G"].getResult(12))
+        self.assertIsNone(loaded["Magic Item Table I"].getResult(76))
+        self.assertEqual(loaded["Magic Item Table G"].getRawResult(76),
+            "Rope of entanglement")
+
+    def test_tableLoaders(self):
+        """ Test building tables while YAML and JSON files are parsed """
+        # Setup
+        table = "table-name: {}\nroll: 1d2\nresults:\n  1: A\n  2-2: B\n"
+        yaml_text = (table.format("A") + "---\nnot: a table\n---\n"
+            + "table-name: Bad\nroll: 1d2\nresults: [A]\n")
+        json_text = ('{"J": {"table-name": "J", "roll": "1d1",'
+            + ' "results": {"1": {"text": "A", "weight": 2}}},'
+            + ' "Bad": {"table-name": "Bad", "roll": "1x1", "results": {}}}')
+        # Results
+        documents = list(file_handler.loadTableDocuments(yaml_text, "a.yaml"))
+        loaded = json.loads(json_text, object_hook=lambda obj:
+            file_handler.tableObjectHook(obj, "j.json"))
+        # Asserts
+        self.assertIsInstance(documents[0], file_handler.Table)
+        self.assertEqual((documents[0].filename, documents[0].getRawResult(2)),
+            ("a.yaml", "B"))
+        # Documents that are not valid tables are left as dictionaries
+        self.assertEqual(documents[1:], [{'not': "a table"},
+            {'table-name': "Bad", 'roll': "1d2", 'results': ["A"]}])
+        self.assertEqual(loaded["J"].filename, "j.json")
+        self.assertEqual(loaded["J"].getRawResult(1), "A")
+        self.assertIsInstance(loaded["Bad"], dict)
+        # Unhashable keys are a YAML error, as with the plain loaders
+        with self.assertRaises(yaml.YAMLError):
+            list(file_handler.loadTableDocuments(table.format("L")
+                + "  ? [3, 4]\n  : C\n", "a.yaml"))
+
+    def test_splitDocuments(self):
+        """ Test splitting raw YAML where each document starts """
+        # Setup
+        data = (b"a: 1\n----\n---\nb: |\n  text\n---foo\n--- !x\nc\r\n"
+            + b"---\r\nd: 4\n")
+        # Results
+        documents = file_handler.splitDocuments(data)
+        # Asserts
+        self.assertEqual([document for _, document in documents],
+            [b"a: 1\n----\n", b"---\nb: |\n  text\n---foo\n",
+            b"--- !x\nc\r\n", b"---\r\nd: 4\n"])
+        self.assertEqual([start for start, _ in documents], [0, 10, 33, 43])
+
     def test_verifyFileExtention(self):
         """ Test file extention verify """
         # Setup
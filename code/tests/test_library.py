@@ -0,0 +1,74 @@
+import unittest
+from unittest.mock import patch
+
+import yaml
+
+from library import TableLibrary, scanFile
+from models import Resolver
+from tests.helpers import TableDirTestCase
+
+class TestTableLibrary(TableDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("a.yaml", self.table.format(name="A", text='"[1@B]"')
+            + "---\n" + self.table.format(name="B", text="One"))
+        self.write("b.json", '{"C": {"table-name": "C", "roll": "1d1",'
+            + ' "results": {"1": "Three"}}}')
+
+    def test_manifest(self):
+        """ Test listing tables from the manifest """
+        library = TableLibrary(self.handler)
+        self.assertEqual(list(library), ["A", "B", "C"])
+        entry = library.entry("B")
+        self.assertEqual((entry.roll, entry.count, entry.file),
+            ("1d2", 2, "a.yaml"))
+        self.assertGreater(entry.offset, 0)
+        self.assertIsNone(library.entry("C").offset)
+        # A second library reads the saved manifest without scanning
+        with patch('library.scanFile', wraps=scanFile) as scanned:
+            again = TableLibrary(self.handler)
+            self.assertEqual(scanned.call_count, 0)
+        self.assertEqual(again.entries, library.entries)
+        # Changed files are scanned again
+        self.write("a.yaml", self.table.format(name="D", text="Four"))
+        self.assertEqual(again.sync(), ["a.yaml"])
+        self.assertEqual(list(again), ["D", "C"])
+
+    def test_lazyLoading(self):
+        """ Test tables are loaded when used """
+        library = TableLibrary(self.handler)
+        self.assertFalse(any(map(library.isLoaded, library)))
+        self.assertEqual(library["C"].getRawResult(1), "Three")
+        self.assertTrue(library.isLoaded("C"))
+        self.assertFalse(library.isLoaded("A"))
+        # Linked tables load when referenced
+        resolver = Resolver(library)
+        test = resolver.get(library["A"].getResult(1))
+        self.assertIn(test, ["[1 on B]\n\tOne", "[1 on B]\n\tTwo"])
+        self.assertTrue(library.isLoaded("B"))
+        self.assertIsNone(library.get("Missing"))
+        # Only tables of changed documents are dropped
+        table_b = library["B"]
+        self.write("a.yaml", self.table.format(name="A", text="Five")
+            + "---\n" + self.table.format(name="B", text="One"))
+        self.assertEqual(library.sync(), ["a.yaml"])
+        self.assertFalse(library.isLoaded("A"))
+        self.assertIs(library["B"], table_b)
+        self.assertEqual(library["A"].getRawResult(1), "Five")
+
+    def test_documentRescan(self):
+        """ Test only changed documents are parsed again """
+        library = TableLibrary(self.handler)
+        text = (self.table.format(name="A", text="Five")
+            + "---\nroll: 1d1\n---\n" + self.table.format(name="B", text="One"))
+        with patch('library.yaml.load', wraps=yaml.load) as parsed:
+            self.write("a.yaml", text)
+            self.assertEqual(library.sync(), ["a.yaml"])
+            # A and the document that is not a table, not B
+            self.assertEqual(parsed.call_count, 2)
+        self.assertEqual(list(library), ["A", "B", "C"])
+        self.assertEqual(library["A"].getRawResult(1), "Five")
+        self.assertEqual(library.entry("B").offset, text.rindex("---"))
+
+if __name__ == '__main__':
+    unittest.main()
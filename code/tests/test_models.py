@@ -1,8 +1,14 @@
 import sys
+import json
+import asyncio
 import unittest
 from unittest.mock import patch, MagicMock
 
-from models import Table, Result, Link, Resolver
+import dice_utils
+from models import Table, Result, Link, Resolver, ResolvedNode
+from models import ParallelResolver
+from models import (TextEvent, RollEvent, EnterTableEvent, ExitTableEvent,
+    TruncatedEvent, TraceRecord, eventText)
 import tests.test_dicts as test_tables
 
 class TestTable(unittest.TestCase):
@@ -54,6 +60,130 @@ class TestTable(unittest.TestCase):
         self.assertFalse(table.resultExists(100))
         self.assertFalse(table.resultExists("foo"))
 
+    def test_rangeKeys(self):
+        """ Test results keyed by ranges of rolls """
+        table = Table.create(test_tables.table_f)
+        self.assertEqual(table.length, 100)
+        self.assertEqual(len(table.intervals), 3)
+        self.assertEqual(table.getRawResult(1), table.getRawResult(50))
+        self.assertEqual(table.getRawResult(51),
+            "Example 2: covers the rest but one")
+        self.assertEqual(table.getRawResult(100), "Example 3: a single roll")
+        self.assertIs(table.getResult(20), table.getResult(30))
+        self.assertIsNone(table.getResult(0))
+        self.assertIsNone(table.getResult(101))
+        self.assertIn(75, table.results)
+        self.assertEqual(list(table.results), list(range(1, 101)))
+        # Overlapping ranges are invalid
+        self.assertIsNone(Table.create(test_tables.table_g))
+
+    def test_mergeRepeatedResults(self):
+        """ Test consecutive repeated results are stored once """
+        table = Table.create({
+            'table-name': 'Repeats', 'roll': '1d6',
+            'results': {1: "A", 2: "A", 3: "B", 4: "A", 5: "A", 6: "A"}
+        })
+        self.assertEqual(table.length, 6)
+        self.assertEqual([(l, h) for l, h, _ in table.intervals],
+            [(1, 2), (3, 3), (4, 6)])
+        self.assertEqual(table.getRawResult(5), "A")
+
+    def test_sample(self):
+        """ Test sampling a table with its alias table """
+        rng = dice_utils.Rng(3)
+        # A 2d6 table with a gap between results
+        table = Table.create({
+            'table-name': 'Gaps', 'roll': '2d6',
+            'results': {2: "Low", '5-7': "Middle", 12: "High"}
+        })
+        counts = {}
+        for _ in range(20000):
+            value, result = table.sample(rng)
+            self.assertIs(result, table.getResult(value))
+            counts[value] = counts.get(value, 0) + 1
+        dist = dice_utils.distribution("2d6")
+        for value in range(2, 13):
+            self.assertAlmostEqual(counts.get(value, 0) / 20000,
+                dist.pmf(value), delta=0.015)
+        # Every roll of a uniform table maps to its result
+        table = Table.create(test_tables.table_f)
+        for _ in range(200):
+            value, result = table.sample(rng)
+            self.assertTrue(1 <= value <= 100)
+            self.assertIs(result, table.getResult(value))
+        # Keeping no dice leaves only the modifier
+        table = Table.create({
+            'table-name': 'Keep None', 'roll': '1d6kh0+2',
+            'results': {'1-2': "Low", '3-6': "High"}
+        })
+        for _ in range(50):
+            value, result = table.sample(rng)
+            self.assertEqual((value, result.text), (2, "Low"))
+
+    def test_weights(self):
+        """ Test results with explicit weights """
+        table = Table.create({
+            'table-name': 'Weighted', 'roll': 'length',
+            'results': {1: {'text': "A", 'weight': 3}, 2: "B"}
+        })
+        rng = dice_utils.Rng(5)
+        picks = [table.sample(rng)[1].text for _ in range(8000)]
+        self.assertAlmostEqual(picks.count("A") / 8000, 0.75, delta=0.03)
+        # Weights must be above 0
+        self.assertIsNone(Table.create({
+            'table-name': 'Bad Weight', 'roll': 'length',
+            'results': {1: {'text': "A", 'weight': 0}}
+        }))
+        self.assertIsNone(Table.create({
+            'table-name': 'No Text', 'roll': 'length',
+            'results': {1: {'weight': 2}}
+        }))
+        # Dicts without a weight are not results, as before weights
+        table = Table.create({
+            'table-name': 'Not Weighted', 'roll': 'length',
+            'results': {1: {'roll-on': "B"}, 2: {'text': "B"}, 3: "C"}
+        })
+        self.assertEqual([table.getRawResult(i) for i in range(1, 4)],
+            [None, None, "C"])
+        self.assertIsNone(table._weights)
+
+    def test_fromEntries(self):
+        """ Test creating a table from its fields and result pairs """
+        table = Table.fromEntries("Pairs", "1d4", [("3-4", "C"), (1, "A"),
+            ("2", {'text': "B", 'weight': 2})], "Group", "pairs.yaml")
+        self.assertEqual((table.name, table.group, table.filename),
+            ("Pairs", "Group", "pairs.yaml"))
+        self.assertEqual([(l, h, r.text) for l, h, r in table.intervals],
+            [(1, 1, "A"), (2, 2, "B"), (3, 4, "C")])
+        # A repeated key keeps its last result, as in a dict
+        table = Table.fromEntries("Repeat", "1d1", [(1, "A"), (1, "B")])
+        self.assertEqual(table.getRawResult(1), "B")
+        self.assertIsNone(Table.fromEntries("Overlap", "1d4",
+            [("1-3", "A"), (3, "B")]))
+        self.assertIsNone(Table.fromEntries("Bad Roll", "1x4", [(1, "A")]))
+        self.assertIsNone(Table.fromEntries(None, "1d1", [(1, "A")]))
+        # Keys that can not be hashed, such as YAML lists, are not valid
+        self.assertIsNone(Table.fromEntries("List Key", "1d2",
+            [([1, 2], "A"), ({'low': 1}, "B")]))
+
+    def test_fromColumns(self):
+        """ Test rebuilding a table from its cached columns """
+        table = Table.fromEntries("Columns", "1d6", [("1-2", "A [1d4]"),
+            (4, {'text': "B", 'weight': 2}), (5, None)], "Group")
+        columns = table.toColumns()
+        self.assertEqual(columns['lows'], [1, 4, 5])
+        self.assertEqual(columns['texts'], ["A [1d4]", "B", None])
+        again = Table.fromColumns(columns, "columns.yaml")
+        self.assertEqual(again.toDict(), table.toDict())
+        self.assertEqual(again.filename, "columns.yaml")
+        self.assertEqual(len(again.getResult(2).links), 1)
+        self.assertIsNone(again.getResult(5))
+        # Columns that no table could have are turned down
+        for key, value in [('lows', [1, 2, 5]), ('highs', [2, 4, True]),
+            ('texts', ["A", 2, None]), ('weights', [None, 0, None]),
+            ('roll', "1x6"), ('group', None)]:
+            self.assertIsNone(Table.fromColumns(dict(columns, **{key: value})))
+
     def test_validateTable(self):
         """ Test Table validation """
         table = Table() # Empty class to use validateTable
@@ -97,6 +227,338 @@ class TestResult(unittest.TestCase):
         self.assertEqual(test.text, "This contains [1d4] Foobars!")
         self.assertIn("1d4", test.links)
 
+    def test_segments(self):
+        """ Test compiling Result text into segments """
+        test = Result.create("A [1d4], a [1d4] and [1@Test Table] [bad]")
+        self.assertEqual(len(test.segments), 7)
+        self.assertEqual(test.segments[0], "A [")
+        self.assertIsInstance(test.segments[1], Link)
+        self.assertIsInstance(test.segments[3], Link)
+        self.assertIsNot(test.segments[1], test.segments[3])
+        self.assertEqual(test.segments[-1], "] [bad]")
+        self.assertEqual(Result.create("No links").segments, ["No links"])
+        test.text = "[2d6]"
+        self.assertEqual(test.segments[0], "[")
+        self.assertEqual(test.segments[1].roll, "2d6")
+
+class TestResolver(unittest.TestCase):
+    def setUp(self):
+        self.tables = {
+            'Test Table B': Table.create({
+                'table-name': 'Test Table B',
+                'roll': '1d1',
+                'results': {1: "B"}
+            })
+        }
+
+    @patch('builtins.print')
+    def test_get(self, mock_print):
+        """ Test resolving results """
+        resolver = Resolver(self.tables)
+        # No links
+        self.assertEqual(resolver.get(Result.create("Plain")), "Plain")
+        # Duplicate inline rolls are each rolled
+        test = resolver.get(Result.create("[1d1] and [1d1+1]"))
+        self.assertEqual(test, "[1] and [2]")
+        test = resolver.get(Result.create("[1d1] and [1d1]"))
+        self.assertEqual(test, "[1] and [1]")
+        # Duplicate table links are each resolved
+        test = resolver.get(Result.create(
+            "[1@Test Table B] [2@Test Table B]"))
+        self.assertEqual(test, "[1 on Test Table B] [2 on Test Table B]"
+            + "\n\tB\n\tB\n\tB")
+        # Missing tables are not resolved
+        test = resolver.get(Result.create("[1@Missing]"))
+        self.assertEqual(test, "[1 on Missing]")
+
+    @patch('builtins.print')
+    def test_budgets(self, mock_print):
+        """ Test self referencing tables stay within budgets """
+        self.tables['Loop'] = Table.create({
+            'table-name': 'Loop', 'roll': '1d1',
+            'results': {1: "Loop [2@Loop]"}
+        })
+        start = self.tables['Loop'].getResult(1)
+        # Depth: 1 + 2 + 4 + 8 results before the cut
+        resolver = Resolver(self.tables, max_depth=3)
+        test = resolver.get(start)
+        self.assertEqual(resolver.truncated, 'depth')
+        self.assertEqual(test.count("Loop ["), 15)
+        self.assertTrue(test.endswith("[Truncated: depth budget exceeded]"))
+        # Expansions
+        resolver = Resolver(self.tables, max_expansions=5)
+        test = resolver.get(start)
+        self.assertEqual(resolver.truncated, 'expansions')
+        self.assertEqual(test.count("Loop ["), 6)
+        # Output
+        resolver = Resolver(self.tables, max_output=100)
+        test = resolver.get(start)
+        self.assertEqual(resolver.truncated, 'output')
+        self.assertLessEqual(test.index("\n\t[Truncated"), 100)
+        # The default budgets stop runaway tables
+        resolver = Resolver(self.tables)
+        resolver.get(start)
+        self.assertIsNotNone(resolver.truncated)
+        # Results within budget are not truncated
+        resolver.get(Result.create("[1@Test Table B]"))
+        self.assertIsNone(resolver.truncated)
+
+    @patch('builtins.print')
+    def test_rollMany(self, mock_print):
+        """ Test resolving many rolls at once """
+        self.tables['Test Table A'] = Table.create(test_tables.table_a)
+        self.tables['Test Table C'] = Table.create({
+            'table-name': 'Test Table C', 'roll': '1d1',
+            'results': {1: "C [1d1] [1@Test Table B]"}
+        })
+        resolver = Resolver(self.tables, rng=dice_utils.Rng(9))
+        test = resolver.roll_many('Test Table C', 3)
+        self.assertEqual(test, ["C [1] [1 on Test Table B]\n\tB"] * 3)
+        # Matches the text get() gives for a fixed nested table
+        single = resolver.get(self.tables['Test Table C'].getResult(1))
+        self.assertEqual(test[0], single)
+        # Every result of a table is resolved
+        resolver = Resolver(self.tables, rng=dice_utils.Rng(9))
+        test = resolver.roll_many('Test Table A', 200)
+        self.assertEqual(len(test), 200)
+        self.assertTrue(all(t.startswith("Example") for t in test))
+        # Same seed, same results
+        again = Resolver(self.tables, rng=dice_utils.Rng(9))
+        self.assertEqual(again.roll_many('Test Table A', 200), test)
+        # Unknown tables
+        self.assertIsNone(resolver.roll_many('Missing', 2))
+
+    @patch('builtins.print')
+    def test_rollManyLinkOrder(self, mock_print):
+        """ Test nested results of roll_many keep the order of their links """
+        for name in ("X", "Y"):
+            self.tables[name] = Table.create({'table-name': name,
+                'roll': '1d1', 'results': {1: f"{name} [1d1]"}})
+        self.tables['Line'] = Table.create({'table-name': 'Line',
+            'roll': '1d1', 'results': {1: "a [1@X] b [1@Y] c [2@X] [1@Y]"}})
+        resolver = Resolver(self.tables, rng=dice_utils.Rng(4))
+        single = Resolver(self.tables, rng=dice_utils.Rng(4)).get(
+            self.tables['Line'].getResult(1))
+        self.assertEqual(resolver.roll_many('Line', 2), [single] * 2)
+        self.assertEqual([line[0] for line in single.split("\n\t")[1:]],
+            ["X", "Y", "X", "X", "Y"])
+
+    @patch('builtins.print')
+    def test_rollManyBudgets(self, mock_print):
+        """ Test budgets when resolving many rolls """
+        self.tables['Loop'] = Table.create({
+            'table-name': 'Loop', 'roll': '1d1',
+            'results': {1: "Loop [2@Loop]"}
+        })
+        resolver = Resolver(self.tables, max_depth=3)
+        test = resolver.roll_many('Loop', 4)
+        self.assertEqual(resolver.truncated, 'depth')
+        self.assertTrue(all(t.count("Loop [") == 15 for t in test))
+        resolver = Resolver(self.tables, max_expansions=5)
+        test = resolver.roll_many('Loop', 2)
+        self.assertTrue(all(t.count("Loop [") == 6 for t in test))
+
+    @patch('builtins.print')
+    def test_iterResolve(self, mock_print):
+        """ Test streaming resolution events """
+        self.tables['Test Table C'] = Table.create({
+            'table-name': 'Test Table C', 'roll': '1d1',
+            'results': {1: "C [1d1] [1@Test Table B]"}
+        })
+        resolver = Resolver(self.tables)
+        events = list(resolver.iter_resolve(
+            self.tables['Test Table C'].getResult(1)))
+        self.assertEqual([type(e) for e in events], [TextEvent, RollEvent,
+            TextEvent, RollEvent, TextEvent, EnterTableEvent, TextEvent,
+            ExitTableEvent])
+        self.assertEqual(events[1].value, 1)
+        self.assertEqual(events[3].link.table, "Test Table B")
+        self.assertEqual(events[5], EnterTableEvent("Test Table B", 1, 1))
+        self.assertEqual(events[6], TextEvent("B", 1))
+        self.assertEqual("".join(map(eventText, events)),
+            "C [1] [1 on Test Table B]\n\tB")
+        # Truncated streams stay balanced
+        self.tables['Loop'] = Table.create({
+            'table-name': 'Loop', 'roll': '1d1',
+            'results': {1: "Loop [2@Loop]"}
+        })
+        resolver = Resolver(self.tables, max_output=60)
+        events = list(resolver.iter_resolve(self.tables['Loop'].getResult(1)))
+        self.assertIsInstance(events[-1], ExitTableEvent)
+        self.assertIn('output', [e.budget for e in events
+            if isinstance(e, TruncatedEvent)])
+        self.assertEqual(
+            sum(isinstance(e, EnterTableEvent) for e in events),
+            sum(isinstance(e, ExitTableEvent) for e in events))
+        # Also when the budget runs out on an enter event
+        self.tables['A'] = Table.create({
+            'table-name': 'A', 'roll': '1d1', 'results': {1: "ab[1@B]"}
+        })
+        self.tables['B'] = Table.create({
+            'table-name': 'B', 'roll': '1d1', 'results': {1: "xy"}
+        })
+        resolver = Resolver(self.tables, max_output=10)
+        events = list(resolver.iter_resolve(self.tables['A'].getResult(1)))
+        self.assertIsInstance(events[-1], TruncatedEvent)
+        self.assertFalse(any(isinstance(e, (EnterTableEvent, ExitTableEvent))
+            for e in events))
+        tree = resolver.resolve_tree(self.tables['A'].getResult(1))
+        self.assertEqual((tree.children, tree.truncated), ([], 'output'))
+
+    @patch('builtins.print')
+    def test_resolveTree(self, mock_print):
+        """ Test resolving into a tree and serializing it """
+        self.tables['Test Table C'] = Table.create({
+            'table-name': 'Test Table C', 'roll': '1d1',
+            'results': {1: "C [1d1] [2@Test Table B]"}
+        })
+        resolver = Resolver(self.tables)
+        start = self.tables['Test Table C'].getResult(1)
+        tree = resolver.resolve_tree(start)
+        self.assertEqual(tree.text, "C [1] [2 on Test Table B]")
+        self.assertEqual(tree.rolls, [("1d1", 1), ("2@Test Table B", 2)])
+        self.assertEqual([(c.table, c.value, c.text) for c in tree.children],
+            [("Test Table B", 1, "B")] * 2)
+        self.assertEqual(tree.render(), resolver.get(start))
+        # Serializers
+        self.assertEqual(tree.toTuple(), (None, None,
+            "C [1] [2 on Test Table B]", (("1d1", 1), ("2@Test Table B", 2)),
+            (("Test Table B", 1, "B", (), ()),) * 2))
+        self.assertEqual(ResolvedNode.fromTuple(tree.toTuple()).toDict(),
+            tree.toDict())
+        self.assertEqual(json.loads(tree.toJson()), tree.toDict())
+        # Trees from roll_many render the same as its strings
+        resolver = Resolver(self.tables, rng=dice_utils.Rng(3))
+        trees = resolver.roll_many('Test Table C', 2, tree=True)
+        self.assertEqual([(t.table, t.value) for t in trees],
+            [('Test Table C', 1)] * 2)
+        self.assertEqual([t.render() for t in trees],
+            [resolver.get(start)] * 2)
+        # Truncation is recorded on the root
+        self.tables['Loop'] = Table.create({
+            'table-name': 'Loop', 'roll': '1d1',
+            'results': {1: "Loop [2@Loop]"}
+        })
+        resolver = Resolver(self.tables, max_depth=3)
+        start = self.tables['Loop'].getResult(1)
+        tree = resolver.resolve_tree(start)
+        self.assertEqual(tree.truncated, 'depth')
+        self.assertEqual(tree.render(), resolver.get(start))
+        self.assertEqual(len(list(tree.walk())), 15)
+
+    @patch('builtins.print')
+    def test_async(self, mock_print):
+        """ Test resolving from a coroutine """
+        self.tables['Test Table C'] = Table.create({
+            'table-name': 'Test Table C', 'roll': '1d1',
+            'results': {1: "C [1d1] [2@Test Table B]"}
+        })
+        resolver = Resolver(self.tables)
+        start = self.tables['Test Table C'].getResult(1)
+        test = asyncio.run(resolver.resolve_async(start, yield_every=2))
+        self.assertEqual(test, (resolver.get(start), None))
+        test = asyncio.run(resolver.roll_many_async('Test Table C', 5,
+            yield_every=2))
+        self.assertEqual(test, (resolver.roll_many('Test Table C', 5), None))
+        self.assertIsNone(asyncio.run(resolver.roll_many_async('Missing', 2)))
+        for bad in (0, -1, 1.5):
+            with self.assertRaises(ValueError):
+                asyncio.run(resolver.resolve_async(start, yield_every=bad))
+            with self.assertRaises(ValueError):
+                asyncio.run(resolver.roll_many_async('Test Table C', 2,
+                    yield_every=bad))
+        # Other tasks run while a large result resolves
+        self.tables['Loop'] = Table.create({
+            'table-name': 'Loop', 'roll': '1d1',
+            'results': {1: "Loop [2@Loop]"}
+        })
+        ticks = []
+        async def ticker():
+            for i in range(3):
+                ticks.append(i)
+                await asyncio.sleep(0)
+        async def both():
+            task = asyncio.create_task(ticker())
+            text, truncated = await resolver.resolve_async(
+                self.tables['Loop'].getResult(1), yield_every=10)
+            self.assertEqual(ticks, [0, 1, 2])
+            await task
+            return text, truncated
+        text, truncated = asyncio.run(both())
+        self.assertIn("Truncated", text)
+        self.assertIsNotNone(truncated)
+        # Concurrent calls on one Resolver each report their own budgets
+        async def concurrent():
+            return await asyncio.gather(
+                resolver.resolve_async(self.tables['Loop'].getResult(1),
+                    yield_every=1),
+                resolver.resolve_async(start, yield_every=1),
+                resolver.roll_many_async('Loop', 3, yield_every=1),
+                resolver.roll_many_async('Test Table C', 3, yield_every=1))
+        loop, plain, many_loop, many_plain = asyncio.run(concurrent())
+        self.assertIsNotNone(loop[1])
+        self.assertIsNone(plain[1])
+        self.assertIsNotNone(many_loop[1])
+        self.assertIsNone(many_plain[1])
+
+    def test_trace(self):
+        """ Test the trace hook """
+        self.tables['Test Table C'] = Table.create({
+            'table-name': 'Test Table C', 'roll': '1d1',
+            'results': {1: "C [2d1+1] [1@Test Table B]"}
+        })
+        start = self.tables['Test Table C'].getResult(1)
+        records = []
+        with patch('builtins.print') as mock_print:
+            test = Resolver(self.tables, trace=records.append).get(start)
+            mock_print.assert_not_called()
+        self.assertEqual(test, "C [3] [1 on Test Table B]\n\tB")
+        self.assertEqual(records[0].link, "2d1+1")
+        self.assertEqual(records[0].value, 3)
+        self.assertEqual(records[0].dice['rolls'], [1, 1])
+        self.assertEqual(records[1], TraceRecord(None, 1, "1@Test Table B",
+            None, 0))
+        self.assertEqual(records[2], TraceRecord("Test Table B", 1, None,
+            None, 1))
+        records = []
+        Resolver(self.tables, trace=records.append).roll_many('Test Table C',
+            2)
+        self.assertEqual([r.table for r in records], ['Test Table C'] * 6
+            + ['Test Table B'] * 2)
+        # Tracing does not change the rolls
+        self.tables['Test Table A'] = Table.create(test_tables.table_a)
+        plain = Resolver(self.tables, rng=dice_utils.Rng(4))
+        traced = Resolver(self.tables, rng=dice_utils.Rng(4),
+            trace=lambda record: None)
+        self.assertEqual(plain.roll_many('Test Table A', 50),
+            traced.roll_many('Test Table A', 50))
+
+class TestParallelResolver(unittest.TestCase):
+    def test_rollMany(self):
+        """ Test resolving across worker processes """
+        tables = {
+            'Test Table A': Table.create(test_tables.table_a),
+            'Test Table B': Table.create({
+                'table-name': 'Test Table B', 'roll': '1d4',
+                'results': {1: "B [1d6] [1d2@Test Table A]", 2: "B2",
+                    3: "B3", 4: "B4"}
+            })
+        }
+        with ParallelResolver(tables, workers=1, seed=5,
+            chunk_size=7) as single:
+            test = single.roll_many('Test Table B', 40)
+            again = single.roll_many('Test Table B', 40)
+            self.assertIsNone(single.roll_many('Missing', 2))
+        self.assertEqual(len(test), 40)
+        self.assertTrue(all(t.startswith("B") for t in test))
+        # The same seed gives the same results for any amount of workers
+        with ParallelResolver(tables, workers=3, seed=5,
+            chunk_size=7) as many:
+            self.assertEqual(many.roll_many('Test Table B', 40), test)
+            self.assertEqual(list(many.iter_roll_many('Test Table B', 40)),
+                again)
+        self.assertNotEqual(test, again)
+
 class TestLink(unittest.TestCase):
     def test_linkCreation(self):
         ''' Test creation of link. This test also returns the dict which allows
@@ -0,0 +1,65 @@
+import os
+import pickle
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import packed_store
+from file_handler import FileHandler
+from models import Resolver
+from packed_store import PackedTable
+from tests.helpers import storeTables
+
+class TestPackedStore(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp.name, "tables.tpk")
+        self.tables = storeTables()
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_pack(self):
+        """ Test packing tables and viewing them """
+        self.assertEqual(packed_store.pack(self.tables, self.path), 3)
+        store = FileHandler(logs=False).openPacked(self.path)
+        self.assertEqual(list(store), ['Test Table A', 'Test Table F',
+            'Weighted'])
+        self.assertNotIn('Broken', store)
+        self.assertIsNone(store.get('Missing'))
+        for name in store:
+            packed, table = store[name], self.tables[name]
+            self.assertIsInstance(packed, PackedTable)
+            self.assertEqual((packed.name, packed.roll, packed.group,
+                packed.length), (table.name, table.roll, table.group,
+                table.length))
+            self.assertEqual(
+                [(l, h, r.text if r else None) for l, h, r in packed.intervals],
+                [(l, h, r.text if r else None) for l, h, r in table.intervals])
+        self.assertIs(store['Weighted'], store['Weighted'])
+        self.assertEqual(store['Weighted']._weights, [9, None])
+        # Tables of the store resolve like loaded tables
+        text = Resolver(store).get(store['Weighted'].getResult(1))
+        self.assertTrue(text.startswith("Heavy dragon [1 on Test Table A]\n\t"))
+        # Big endian machines read copies with the bytes of each number
+        # swapped, so the swap is undone here
+        offsets = list(store.array('Q', 16, 4))
+        with patch.object(packed_store.sys, 'byteorder', 'big'):
+            swapped = store.array('Q', 16, 4)
+        swapped.byteswap()
+        self.assertEqual(list(swapped), offsets)
+        # Stores are pickled by path
+        again = pickle.loads(pickle.dumps(store))
+        self.assertEqual(list(again), list(store))
+        again.close()
+        store.close()
+
+    def test_invalid(self):
+        """ Test opening files that are not packed tables """
+        with open(self.path, 'wb') as file:
+            file.write(b"table-name: A\n")
+        self.assertIsNone(FileHandler(logs=False).openPacked(self.path))
+        self.assertIsNone(FileHandler(logs=False).openPacked("missing.tpk"))
+
+if __name__ == '__main__':
+    unittest.main()
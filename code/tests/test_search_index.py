@@ -0,0 +1,63 @@
+import unittest
+
+from models import Table
+from search_index import SearchIndex, SearchHit
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tables = {
+            "Monsters": Table.create({'table-name': "Monsters", 'roll': "1d3",
+                'results': {1: "A Lich and its Ghouls", 2: "Goblins",
+                3: "[1@Treasure]"}}),
+            "Treasure": Table.create({'table-name': "Treasure", 'roll': "1d2",
+                'results': {1: "Potion of Healing", 2: "The Lich's phylactery"}}),
+        }
+
+    def test_search(self):
+        """ Test finding results by words and by parts of their text """
+        index = SearchIndex(self.tables)
+        self.assertEqual(index.search("lich"), [
+            SearchHit("Monsters", 1, 1, "A Lich and its Ghouls"),
+            SearchHit("Treasure", 2, 2, "The Lich's phylactery")])
+        self.assertEqual(index.search("potion of healing"),
+            [SearchHit("Treasure", 1, 1, "Potion of Healing")])
+        # Substrings that are not whole words go through the trigrams
+        self.assertEqual([hit.text for hit in index.search("blin")],
+            ["Goblins"])
+        self.assertEqual(index.tables("@treas"), ["Monsters"])
+        self.assertEqual(len(index.search("s")), 4)
+        self.assertEqual(index.search("dragon"), [])
+        self.assertEqual(index.search("  "), [])
+        self.assertEqual(len(index.search("lich", limit=1)), 1)
+
+    def test_searchWords(self):
+        """ Test finding results by whole words in any order """
+        index = SearchIndex(self.tables)
+        self.assertEqual(index.tables("healing potion", words=True),
+            ["Treasure"])
+        self.assertEqual(index.search("lic", words=True), [])
+        self.assertEqual(index.tables("lich ghouls", words=True), ["Monsters"])
+
+    def test_update(self):
+        """ Test reindexing changed tables and dropping removed ones """
+        index = SearchIndex(self.tables)
+        self.tables["Monsters"] = Table.create({'table-name': "Monsters",
+            'roll': "1d1", 'results': {1: "Dragon"}})
+        index.update(self.tables, ["Monsters"])
+        self.assertEqual(index.tables("lich"), ["Treasure"])
+        self.assertEqual(index.tables("drag"), ["Monsters"])
+
+        del self.tables["Treasure"]
+        index.update(self.tables)
+        self.assertNotIn("Treasure", index)
+        self.assertEqual(index.search("lich"), [])
+        # Postings of removed results are gone, not just filtered out
+        self.assertNotIn("lic", index._trigrams)
+        self.assertNotIn("potion", index._tokens)
+
+        self.tables["Broken"] = None
+        index.update(self.tables)
+        self.assertEqual(len(index), 1)
+
+if __name__ == '__main__':
+    unittest.main()
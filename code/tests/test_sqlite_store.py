@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+from file_handler import FileHandler
+from models import Resolver
+from sqlite_store import SqliteLibrary
+from tests.helpers import storeTables
+
+class TestSqliteLibrary(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp.name, "tables.sqlite")
+        self.tables = storeTables()
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_importTables(self):
+        """ Test importing tables and loading them on demand """
+        library = SqliteLibrary(self.path, cache_size=2)
+        self.assertEqual(library.importTables(self.tables), 3)
+        self.assertEqual(list(library), ['Test Table A', 'Test Table F',
+            'Weighted'])
+        self.assertNotIn('Broken', library)
+        self.assertIsNone(library.get('Missing'))
+        for name in library:
+            loaded, table = library[name], self.tables[name]
+            self.assertEqual((loaded.roll, loaded.group, loaded.length),
+                (table.roll, table.group, table.length))
+            self.assertEqual(
+                [(l, h, r.text if r else None) for l, h, r in loaded.intervals],
+                [(l, h, r.text if r else None) for l, h, r in table.intervals])
+        self.assertEqual(library['Weighted']._weights, [9, None])
+        self.assertEqual(library.group('Test'), ['Weighted'])
+        # Loaded tables are kept, up to the cache size
+        self.assertIs(library['Weighted'], library['Weighted'])
+        table_a = library['Test Table A']
+        library['Test Table F'], library['Weighted']
+        self.assertIsNot(library['Test Table A'], table_a)
+        # Linked tables are loaded when rolled on
+        text = Resolver(library).get(library['Weighted'].getResult(1))
+        self.assertTrue(text.startswith("Heavy dragon [1 on Test Table A]"))
+        # Imports replace tables with the same name
+        self.assertEqual(library.importTables({'Weighted':
+            self.tables['Test Table F']}), 1)
+        self.assertEqual(library["Weighted"].roll,
+            self.tables["Test Table F"].roll)
+        self.assertEqual(len(library), 3)
+        library.close()
+
+    def test_search(self):
+        """ Test searching result text """
+        library = SqliteLibrary(self.path)
+        library.importTables(self.tables)
+        self.assertEqual(library.search("dragon"),
+            [('Weighted', 1, 1, "Heavy dragon [1@Test Table A]")])
+        self.assertEqual(library.search("nothing"), [])
+        library.importTables({'Weighted': self.tables['Test Table F']})
+        self.assertEqual(library.search("dragon"), [])
+        library.close()
+
+    def test_importFiles(self):
+        """ Test importing table files in one transaction """
+        handler = FileHandler(logs=False)
+        with open(os.path.join(self.temp.name, "a.yaml"), 'w') as file:
+            file.write("table-name: A\nroll: 1d1\nresults:\n  1: One\n"
+                + "---\ntable-name: A\nroll: 1d1\nresults:\n  1: Two\n")
+        library = SqliteLibrary(self.path)
+        self.assertEqual(library.importFiles(handler, [self.temp.name]), 1)
+        self.assertEqual(library['A'].getRawResult(1), "One")
+        library.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import unittest
+
+from tests.helpers import TableDirTestCase
+from watcher import TableWatcher
+
+class TestTableWatcher(TableDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("a.yaml", self.table.format(name="A", text="One")
+            + "---\n" + self.table.format(name="B", text="Two"))
+
+    def check(self, watcher):
+        self.assertEqual(watcher.track(), ["a.yaml"])
+        self.assertEqual(watcher.changes(), [])
+        self.write("a.yaml", self.table.format(name="A", text="One")
+            + "---\n" + self.table.format(name="B", text="Three"))
+        self.assertEqual(watcher.changes(), ["a.yaml"])
+        self.assertEqual(watcher.changes(), [])
+        # New and deleted files, other extensions are ignored
+        self.write("b.yaml", self.table.format(name="C", text="Four"))
+        self.write("notes.txt", "Not a table")
+        self.assertEqual(watcher.changes(), ["b.yaml"])
+        os.remove(os.path.join(self.dir, "a.yaml"))
+        self.assertEqual(watcher.changes(), ["a.yaml"])
+        self.assertEqual(watcher.changes(), [])
+        watcher.close()
+        self.assertFalse(watcher.inotify)
+
+    def test_polling(self):
+        """ Test finding changed files by modification time """
+        watcher = TableWatcher(self.handler, use_inotify=False)
+        self.assertFalse(watcher.inotify)
+        self.check(watcher)
+
+    def test_inotify(self):
+        """ Test finding changed files with inotify """
+        watcher = TableWatcher(self.handler)
+        if not watcher.inotify:
+            self.skipTest("inotify is not available")
+        self.check(watcher)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+"""
+    TableWatcher class
+    - watch a directory of table files
+    - find the files that changed, for TableLibrary.sync() to rescan
+"""
+from logger import setup_logger
+import file_handler as fh
+import ctypes
+import ctypes.util
+import os
+import struct
+
+main_logger, models_logger, fhandler_logger = setup_logger()
+
+class Inotify:
+    """
+    Minimal non-blocking inotify watch on a single directory, through libc.
+    Creating one raises OSError where inotify is not available.
+    """
+    IN_MODIFY = 0x002
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self, path:str) -> None:
+        name = ctypes.util.find_library("c")
+        if not name:
+            raise OSError("libc not found")
+        libc = ctypes.CDLL(name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify not available")
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = (self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_FROM
+            | self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE)
+        if libc.inotify_add_watch(self._fd, os.fsencode(path), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"Could not watch {path}")
+
+    def read(self) -> set:
+        """
+        Read the pending events without blocking.
+        :return: set. Names of the files with events, None if events were
+            lost and every file should be checked.
+        """
+        names = set()
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                return names
+            offset = 0
+            while offset < len(data):
+                _, mask, _, size = self.EVENT.unpack_from(data, offset)
+                offset += self.EVENT.size
+                if mask & self.IN_Q_OVERFLOW:
+                    names = None
+                elif names is not None:
+                    names.add(os.fsdecode(
+                        data[offset:offset + size].rstrip(b"\0")))
+                offset += size
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+class TableWatcher:
+    """
+    Watches a directory of table files for files that are changed, added or
+    removed. Uses inotify where available and compares file modification
+    times and sizes otherwise. Reloading is left to TableLibrary.sync(),
+    which parses again only the YAML documents that changed.
+    """
+    def __init__(self, handler:fh.FileHandler, dir:str="",
+        use_inotify:bool=True, logs:bool=False) -> None:
+        """
+        Initialize the watcher. Changes are looked for once track() is called.
+        :param handler: FileHandler. Used to list files.
+        :param dir: str. Directory to watch, the handler's directory if empty.
+        :param use_inotify: bool. Use inotify when available.
+        """
+        self._handler = handler
+        self._dir = dir if dir else handler.dir
+        self._logging = logs
+        # File name to (modification time, size) when last seen
+        self._stats = {}
+        self._inotify = None
+        if use_inotify:
+            try:
+                self._inotify = Inotify(self._dir)
+            except OSError as e:
+                if self._logging:
+                    fhandler_logger.debug(f"Polling {self._dir}, inotify not"
+                    + f" used: {e}")
+
+    def track(self) -> list:
+        """
+        Start looking for changes from the current state of the directory
+        without loading any tables, for use with changes().
+        :return: list. Names of the files in the directory.
+        """
+        if self._inotify:
+            self._inotify.read()
+        files = self._handler.listFiles(self._dir)
+        self._stats = {f: self._stat(f) for f in files}
+        return files
+
+    def changes(self) -> list:
+        """
+        Find the files that were changed, added or removed since the last
+        call, without loading them.
+        :return: list. Names of the changed files, in sorted order.
+        """
+        names = self._inotify.read() if self._inotify else None
+        if names is None:
+            names = set(self._handler.listFiles(self._dir)) | set(self._stats)
+        else:
+            names = {n for n in names
+                if n.split('.')[-1] in self._handler.exts}
+
+        changed = []
+        for name in sorted(names):
+            stat = self._stat(name)
+            if stat == self._stats.get(name):
+                continue
+            changed.append(name)
+            if stat is None:
+                self._stats.pop(name, None)
+            else:
+                self._stats[name] = stat
+        return changed
+
+    def _stat(self, name:str) -> tuple:
+        return fh.fileStamp(os.path.join(self._dir, name))
+
+    def close(self) -> None:
+        """
+        Stop watching the directory.
+        """
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+
+    @property
+    def dir(self) -> str:
+        return self._dir
+
+    @property
+    def inotify(self) -> bool:
+        """
+        True if changes are found with inotify rather than by polling.
+        """
+        return self._inotify is not None